@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+from parsing import Document
+from indexation import IndexerSimple, load_binary, index_spimi
+
+def scale_collection(collection, factor):
+    '''
+        construit une collection factor fois plus grande en dupliquant
+        les documents sous de nouveaux identifiants
+
+        paramètres
+        ----------
+        collection : dict of int -> Document
+                     collection d'origine
+        factor : int
+                 nombre de copies de la collection
+        renvoie
+        -------
+        scaled : dict of int -> Document
+                 collection agrandie
+    '''
+    scaled = dict()
+    # décalage strictement supérieur au plus grand identifiant : les
+    # copies ne se chevauchent pas, même si un identifiant vaut 0
+    offset = max(collection.keys()) + 1 if collection else 0
+    for k in range(factor):
+        for (i, doc) in collection.items():
+            new_id = i + k * offset
+            scaled[new_id] = Document(new_id, doc.get_text(), doc.get_hyperlinks())
+    return scaled
+
+def bench_stemming(collection):
+    '''
+        mesure le débit (tokens / s) de la racinisation de tous les
+        tokens de la collection, sans puis avec le cache de porter.stem
+
+        paramètres
+        ----------
+        collection : dict of int -> Document
+                     collection dont les tokens sont racinisés
+        renvoie
+        -------
+        results : dict of string -> float
+                  débit sans et avec cache, et taux de succès du cache
+    '''
+    import porter
+    from indexation import WORDS
+    tokens = [word.lower() for doc in collection.values() for word in WORDS.findall(doc.get_text())]
+    results = dict()
+    for (name, function) in (("sans cache", porter.stem_uncached), ("avec cache", porter.stem)):
+        porter.stem.cache_clear()
+        start = time.perf_counter()
+        for token in tokens:
+            function(token)
+        elapsed = time.perf_counter() - start
+        results[name] = len(tokens) / elapsed
+        print("{} : {:.0f} tokens / s".format(name, results[name]))
+    hits, misses, results["taux de succès"] = porter.cache_stats()
+    print("cache : {} succès, {} échecs ({:.1%})".format(hits, misses, results["taux de succès"]))
+    return results
+
+def bench_indexation(collection, factors=(1, 2, 4, 8)):
+    '''
+        mesure le temps d'indexation de collections de tailles
+        croissantes : un temps par document constant indique un
+        passage à l'échelle linéaire
+
+        paramètres
+        ----------
+        collection : dict of int -> Document
+                     collection de base
+        factors : tuple of int
+                  facteurs d'agrandissement de la collection
+        renvoie
+        -------
+        results : list of (int, float)
+                  liste de couples nombre de documents - temps (s)
+    '''
+    results = []
+    for factor in factors:
+        docs = scale_collection(collection, factor)
+        indexer = IndexerSimple("bench.txt")
+        start = time.perf_counter()
+        indexer.indexation(docs, save=False)
+        elapsed = time.perf_counter() - start
+        results.append((len(docs), elapsed))
+        print("{} documents : {:.3f} s ({:.0f} documents / s)".format(len(docs),\
+                elapsed, len(docs) / elapsed))
+    return results
+
+def bench_parallel(collection, workers=(1, 2, 4), factor=8):
+    '''
+        mesure le débit de l'indexation parallèle selon le nombre de
+        processus, sur une collection agrandie factor fois
+
+        paramètres
+        ----------
+        collection : dict of int -> Document
+                     collection de base
+        workers : tuple of int (par défault (1, 2, 4))
+                  nombres de processus
+        factor : int (par défault 8)
+                 facteur d'agrandissement de la collection
+        renvoie
+        -------
+        results : dict of int -> float
+                  débit (documents / s) pour chaque nombre de processus
+    '''
+    docs = scale_collection(collection, factor)
+    results = dict()
+    for n in workers:
+        indexer = IndexerSimple("bench.txt")
+        start = time.perf_counter()
+        indexer.indexation(docs, save=False, workers=n)
+        elapsed = time.perf_counter() - start
+        results[n] = len(docs) / elapsed
+        print("{} processus : {:.3f} s ({:.0f} documents / s, accélération {:.2f})".format(n,\
+                elapsed, results[n], results[n] / results[workers[0]]))
+    return results
+
+def bench_spimi(collection, run_postings=(1 << 20, 1 << 16, 1 << 12), factor=8):
+    '''
+        compare le temps et le pic de mémoire (mesuré par tracemalloc) de
+        l'indexation en mémoire suivie de save_binary et de l'indexation
+        SPIMI (index_spimi) pour plusieurs tailles de runs, sur une
+        collection agrandie factor fois
+
+        paramètres
+        ----------
+        collection : dict of int -> Document
+                     collection de base
+        run_postings : tuple of int (par défault (1 << 20, 1 << 16, 1 << 12))
+                       nombres maximaux de postings par run
+        factor : int (par défault 8)
+                 facteur d'agrandissement de la collection
+        renvoie
+        -------
+        results : dict of string -> (float, int)
+                  temps (s) et pic de mémoire (octets) de chaque méthode
+    '''
+    docs = scale_collection(collection, factor)
+    results = dict()
+    with tempfile.TemporaryDirectory() as dirname:
+        fname = os.path.join(dirname, "bench.bin")
+        methods = [("en mémoire", None)] + [("SPIMI runs de {} postings".format(n), n) for n in run_postings]
+        for (name, n) in methods:
+            tracemalloc.start()
+            start = time.perf_counter()
+            if n is None:
+                indexer = IndexerSimple("bench.txt")
+                indexer.indexation(docs, save=False)
+                indexer.save_binary(fname)
+            else:
+                indexer = index_spimi(iter(docs.values()), "bench.txt", fname, run_postings=n)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = (elapsed, peak)
+            print("{} : {:.3f} s, pic de mémoire {:.1f} Mo".format(name, elapsed, peak / 2**20))
+            del indexer
+    return results
+
+def bench_streaming(name, run_postings=1 << 16):
+    '''
+        compare le pic de mémoire (mesuré par tracemalloc) et le temps de
+        l'indexation d'un fichier après construction de la collection
+        (Parser.buildDocCollection puis indexation en mémoire) et de son
+        indexation en flux (Parser.iterDocuments consommé par index_spimi)
+
+        paramètres
+        ----------
+        name : string
+               nom du fichier contenant la collection
+        run_postings : int (par défault 1 << 16)
+                       nombre maximal de postings par run SPIMI
+        renvoie
+        -------
+        results : dict of string -> (float, int)
+                  temps (s) et pic de mémoire (octets) de chaque méthode
+    '''
+    from parsing import Parser
+    results = dict()
+    with tempfile.TemporaryDirectory() as dirname:
+        fname = os.path.join(dirname, "bench.bin")
+        for method in ("collection", "flux"):
+            tracemalloc.start()
+            start = time.perf_counter()
+            parser = Parser()
+            if method == "collection":
+                parser.buildDocCollection(name)
+                indexer = IndexerSimple(name)
+                indexer.indexation(parser.getCollection(), save=False)
+                indexer.save_binary(fname)
+            else:
+                indexer = index_spimi(parser.iterDocuments(name), name, fname, run_postings=run_postings)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[method] = (elapsed, peak)
+            print("{} : {:.3f} s, pic de mémoire {:.1f} Mo".format(method, elapsed, peak / 2**20))
+            del parser, indexer
+    return results
+
+def bench_document_store(name, n_access=1000):
+    '''
+        compare la mémoire occupée (mesurée par tracemalloc) par la
+        collection construite en mémoire et par la collection paresseuse
+        (SourceDocumentStore), ainsi que la latence d'accès à un document
+
+        paramètres
+        ----------
+        name : string
+               nom du fichier contenant la collection
+        n_access : int (par défault 1000)
+                   nombre d'accès à des documents tirés au hasard
+        renvoie
+        -------
+        results : dict of string -> (int, float)
+                  mémoire (octets) et latence moyenne d'accès (µs) de
+                  chaque collection
+    '''
+    import random
+    from parsing import Parser
+    results = dict()
+    for lazy in (False, True):
+        tracemalloc.start()
+        parser = Parser()
+        parser.buildDocCollection(name, lazy=lazy)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        collection = parser.getCollection()
+        ids = random.Random(0).choices(list(collection), k=n_access) if len(collection) else []
+        start = time.perf_counter()
+        for i in ids:
+            collection[i].get_text()
+        elapsed = time.perf_counter() - start
+        method = "paresseuse" if lazy else "en mémoire"
+        results[method] = (memory, 1e6 * elapsed / max(len(ids), 1))
+        print("collection {} : {:.1f} Mo, {:.1f} µs / document".format(method, memory / 2**20,\
+                results[method][1]))
+    return results
+
+def bench_index_size(indexer):
+    '''
+        compare la taille de l'index selon son format de sauvegarde
+        (fichiers texte, pickle, binaire brut et binaire compressé) ainsi
+        que le temps de lecture de toutes les listes de postings
+
+        paramètres
+        ----------
+        indexer : object IndexerSimple
+                  index déjà construit
+        renvoie
+        -------
+        sizes : dict of string -> int
+                taille en octets de chaque format
+    '''
+    sizes = dict()
+    sizes["texte"] = sum(len("{'" + str(i) + "': " + str(tokens) + "}\n") for \
+            (i, tokens) in indexer.get_index().items()) + sum(len("{'" + token + "': " + \
+            str(postings) + "}\n") for (token, postings) in indexer.get_index_inverse().items())
+    sizes["pickle"] = len(pickle.dumps(indexer))
+    with tempfile.TemporaryDirectory() as dirname:
+        for compress in (False, True):
+            name = "binaire compressé" if compress else "binaire"
+            fname = os.path.join(dirname, name.replace(" ", "_") + ".bin")
+            indexer.save_binary(fname, compress=compress)
+            sizes[name] = os.path.getsize(fname)
+            loaded = load_binary(fname)
+            sizes[name + " (postings)"] = sum(array.nbytes for (section, array) in \
+                    loaded.sections.items() if section.startswith("inv_"))
+            start = time.perf_counter()
+            for token in loaded.terms:
+                loaded.getPostingsForStem(token)
+            elapsed = time.perf_counter() - start
+            print("{} : lecture de toutes les listes de postings en {:.3f} s".format(name, elapsed))
+            del loaded
+    for (name, size) in sizes.items():
+        print("{} : {} octets".format(name, size))
+    return sizes
+
+def bench_queries(models, queries, repeat=3):
+    '''
+        mesure la latence moyenne de getRanking pour chaque modèle
+
+        paramètres
+        ----------
+        models : dict of string -> IRModel
+                 modèles à évaluer, indexés par leur nom
+        queries : list of string
+                  requêtes
+        repeat : int (par défault 3)
+                 nombre de passages sur l'ensemble des requêtes
+        renvoie
+        -------
+        latencies : dict of string -> float
+                    latence moyenne (ms) par requête de chaque modèle
+    '''
+    latencies = dict()
+    for (name, model) in models.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                model.getRanking(query)
+        elapsed = time.perf_counter() - start
+        latencies[name] = 1000 * elapsed / max(repeat * len(queries), 1)
+        print("{} : {:.3f} ms / requête".format(name, latencies[name]))
+    return latencies
+
+def bench_pruning(indexer, queries, ks=(10, 100, 1000), repeat=5):
+    '''
+        compare la latence de l'évaluation exhaustive et des stratégies
+        d'élagage dynamique (MaxScore, WAND, Block-Max WAND) des modèles
+        OkapiBM25, ModeleLangue et Vectoriel (produit scalaire et score
+        cosinus), et vérifie que les classements sont identiques
+
+        les stratégies sont mesurées à tour de rôle à chaque passage et la
+        latence retenue est celle du passage le plus rapide, pour limiter
+        l'effet des variations de charge de la machine
+
+        paramètres
+        ----------
+        indexer : object IndexerSimple
+        queries : list of string
+                  requêtes
+        ks : tuple of int (par défault (10, 100, 1000))
+             tailles de classement à évaluer
+        repeat : int (par défault 5)
+                 nombre de passages sur l'ensemble des requêtes
+        renvoie
+        -------
+        latencies : dict of (string, string, int) -> float
+                    latence (ms) par requête pour chaque modèle, stratégie
+                    et taille de classement
+    '''
+    from weighter import Weighter2, Weighter5
+    from models import Vectoriel, ModeleLangue, OkapiBM25
+    models = [("OkapiBM25", lambda pruning: OkapiBM25(indexer, pruning=pruning)),\
+            ("ModeleLangue", lambda pruning: ModeleLangue(indexer, pruning=pruning)),\
+            ("Vectoriel", lambda pruning: Vectoriel(indexer, Weighter2(indexer), pruning=pruning)),\
+            ("Vectoriel cosinus", lambda pruning: Vectoriel(indexer, Weighter5(indexer), True, pruning=pruning))]
+    latencies = dict()
+    for (model_name, model) in models:
+        rankers = {pruning: model(pruning) for pruning in (None, "maxscore", "wand", "bmw")}
+        for k in ks:
+            rankings = dict()
+            best = {pruning: float("inf") for pruning in rankers}
+            for _ in range(repeat):
+                for (pruning, ranker) in rankers.items():
+                    start = time.perf_counter()
+                    rankings[pruning] = [ranker.getRanking(query, k) for query in queries]
+                    best[pruning] = min(best[pruning], time.perf_counter() - start)
+            for pruning in rankers:
+                name = pruning or "exhaustive"
+                latencies[(model_name, name, k)] = 1000 * best[pruning] / max(len(queries), 1)
+                print("{} k={} {} : {:.3f} ms / requête{}".format(model_name, k, name,\
+                        latencies[(model_name, name, k)],\
+                        "" if rankings[pruning] == rankings[None] else " (classement différent)"))
+    return latencies
+
+def bench_budget(model, queries, budgets=(None, 10000, 1000, 100), k=10):
+    '''
+        mesure, pour plusieurs budgets de postings, la latence de
+        l'évaluation score par score (models.ScoreAtATime) d'un modèle et
+        la part des k premiers documents du modèle qu'elle retrouve
+
+        paramètres
+        ----------
+        model : object IRModel
+                modèle évalué (Vectoriel, ModeleLangue ou OkapiBM25)
+        queries : list of string
+                  requêtes
+        budgets : tuple of int (par défault (None, 10000, 1000, 100))
+                  nombres maximaux de postings parcourus par requête
+        k : int (par défault 10)
+            taille des classements comparés
+        renvoie
+        -------
+        results : dict of int -> (float, float)
+                  latence moyenne (ms) par requête et rappel des k premiers
+                  documents pour chaque budget
+    '''
+    from models import ScoreAtATime
+    reference = [set(idDoc for (idDoc, score) in model.getRanking(query, k)) for query in queries]
+    results = dict()
+    for budget in budgets:
+        ranker = ScoreAtATime(model, budget=budget)
+        start = time.perf_counter()
+        rankings = [set(idDoc for (idDoc, score) in ranker.getRanking(query, k)) for query in queries]
+        elapsed = time.perf_counter() - start
+        found = sum(len(ref & ranking) for (ref, ranking) in zip(reference, rankings))
+        recall = found / max(sum(len(ref) for ref in reference), 1)
+        results[budget] = (1000 * elapsed / max(len(queries), 1), recall)
+        print("budget {} : {:.3f} ms / requête, rappel@{} {:.3f}".format(budget,\
+                results[budget][0], k, recall))
+    return results
+
+def bench_pagerank(model, parser, queries, n=20, k=5):
+    '''
+        mesure la latence moyenne de PageRank.compute_pageRank, sans et
+        avec redistribution du score des noeuds sans lien sortant
+
+        paramètres
+        ----------
+        model : object IRModel
+                modèle fournissant les documents seeds
+        parser : object Parser
+                 hyperliens des documents
+        queries : list of string
+                  requêtes
+        n, k : int (par défault 20 et 5)
+               paramètres de PageRank
+        renvoie
+        -------
+        latencies : dict of boolean -> float
+                    latence moyenne (ms) par requête
+    '''
+    from pageRank import PageRank
+    pageRank = PageRank(model, n, k)
+    latencies = dict()
+    for dangling in (False, True):
+        start = time.perf_counter()
+        for query in queries:
+            pageRank.compute_pageRank(query, parser, dangling=dangling)
+        elapsed = time.perf_counter() - start
+        latencies[dangling] = 1000 * elapsed / max(len(queries), 1)
+        print("PageRank{} : {:.3f} ms / requête".format(" (dangling)" if dangling else "",\
+                latencies[dangling]))
+    return latencies
+
+def all_models(indexer):
+    '''
+        construit les modèles de RI sur un index
+
+        paramètres
+        ----------
+        indexer : object IndexerSimple
+        renvoie
+        -------
+        models : dict of string -> IRModel
+    '''
+    from weighter import Weighter1, Weighter2, Weighter3, Weighter4, Weighter5
+    from models import Vectoriel, ModeleLangue, OkapiBM25
+    models = dict()
+    for weighter in (Weighter1, Weighter2, Weighter3, Weighter4, Weighter5):
+        for normalized in (False, True):
+            models["Vectoriel({}, {})".format(weighter.__name__, normalized)] = \
+                    Vectoriel(indexer, weighter(indexer), normalized)
+    models["ModeleLangue"] = ModeleLangue(indexer)
+    models["OkapiBM25"] = OkapiBM25(indexer)
+    return models
+
+if __name__ == '__main__':
+    import sys
+    from parsing import Parser
+    from query import QueryParser
+    parser = Parser()
+    parser.buildDocCollection(sys.argv[1] if len(sys.argv) > 1 else "../data/cacm/cacmShort-good.txt")
+    bench_stemming(parser.getCollection())
+    bench_indexation(parser.getCollection())
+    bench_parallel(parser.getCollection())
+    bench_spimi(parser.getCollection())
+    bench_streaming(parser.getSource())
+    bench_document_store(parser.getSource())
+    indexer = IndexerSimple(parser.getSource())
+    indexer.indexation(parser.getCollection(), save=False)
+    bench_index_size(indexer)
+    qParser = QueryParser()
+    qParser.buildQueriesCollection(sys.argv[2] if len(sys.argv) > 2 else "../data/cacm/cacm.qry")
+    queries = list(qParser.getQueriesCollection().values())
+    bench_queries(all_models(indexer), queries)
+    bench_pruning(indexer, queries)
+    if os.path.exists("../index/cacm.bin"):
+        # l'élagage n'a d'intérêt que sur des listes de postings longues
+        bench_pruning(load_binary("../index/cacm.bin"), queries)
+    from models import OkapiBM25
+    bench_budget(OkapiBM25(indexer), queries)
+    bench_pagerank(OkapiBM25(indexer), parser, queries)
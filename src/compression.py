@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# nombre de postings par bloc
+BLOCK_SIZE = 128
+# en deçà de ce nombre d'octets, le décodage en Python pur est plus
+# rapide que le décodage vectorisé
+SMALL_DECODE = 32
+
+def narrow(values):
+    '''
+        convertit un tableau d'entiers positifs en uint32 si ses valeurs
+        le permettent (le type est enregistré dans la table des sections
+        du fichier de l'index)
+
+        paramètres
+        ----------
+        values : np.array of int64
+        renvoie
+        -------
+        values : np.array of uint32 ou int64
+    '''
+    if len(values) == 0 or values.max() < 2**32:
+        return values.astype(np.uint32)
+    return values
+
+def vbyte_encode(values):
+    '''
+        encode des entiers positifs en variable-byte : 7 bits de données
+        par octet, le bit de poids fort marque le dernier octet d'un entier
+
+        paramètres
+        ----------
+        values : np.array of int
+                 entiers positifs inférieurs à 2**35
+        renvoie
+        -------
+        data : np.array of uint8
+               octets encodés
+    '''
+    values = np.asarray(values, dtype=np.int64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 5):
+        nbytes += values >= (1 << (7*k))
+    ends = np.cumsum(nbytes)
+    owner = np.repeat(np.arange(len(values)), nbytes)
+    pos = np.arange(ends[-1] if len(values) else 0) - (ends - nbytes)[owner]
+    data = ((values[owner] >> (7*pos)) & 0x7f).astype(np.uint8)
+    data[ends - 1] |= 0x80
+    return data
+
+def vbyte_decode(data):
+    '''
+        décode une suite d'entiers encodés par vbyte_encode
+
+        paramètres
+        ----------
+        data : np.array of uint8
+               octets encodés
+        renvoie
+        -------
+        values : np.array of int64
+                 entiers décodés
+    '''
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) <= SMALL_DECODE:
+        values = []
+        value = shift = 0
+        for byte in data.tolist():
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if byte & 0x80:
+                values.append(value)
+                value = shift = 0
+        return np.array(values, dtype=np.int64)
+    ends = (data & 0x80) != 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    owner = np.cumsum(ends) - ends
+    pos = np.arange(len(data)) - starts[owner]
+    payload = (data & 0x7f).astype(np.int64) << (7*pos)
+    return np.add.reduceat(payload, starts)
+
+def split_blocks(ptr, block_size=BLOCK_SIZE):
+    '''
+        découpe des listes contiguës en blocs de block_size éléments (le
+        dernier bloc de chaque liste pouvant être incomplet)
+
+        paramètres
+        ----------
+        ptr : np.array of int64, shape (n_lists + 1,)
+              positions de début et de fin de chaque liste
+        block_size : int (par défault BLOCK_SIZE)
+                     nombre d'éléments par bloc
+        renvoie
+        -------
+        blk_ptr : np.array of int64, shape (n_lists + 1,)
+                  premier bloc de chaque liste
+        blk_start, blk_end : np.array of int64, shape (n_blocks,)
+                  positions de début et de fin de chaque bloc
+    '''
+    ptr = np.asarray(ptr, dtype=np.int64)
+    lengths = np.diff(ptr)
+    n_blocks = (lengths + block_size - 1) // block_size
+    blk_ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    blk_ptr[1:] = np.cumsum(n_blocks)
+
+    owner = np.repeat(np.arange(len(lengths)), n_blocks)
+    rank = np.arange(blk_ptr[-1]) - blk_ptr[owner]
+    blk_start = ptr[owner] + rank * block_size
+    blk_end = np.minimum(blk_start + block_size, ptr[owner + 1])
+    return blk_ptr, blk_start, blk_end
+
+def encode_postings(ptr, ids, tfs, block_size=BLOCK_SIZE):
+    '''
+        compresse des listes de postings triées par identifiant croissant
+
+        chaque liste est découpée en blocs de block_size postings, codés
+        en variable-byte dans un seul flux : pour chaque bloc, les écarts
+        d'identifiants (le premier écart d'un bloc est pris par rapport au
+        dernier identifiant du bloc précédent), doublés et augmentés de 1
+        si le tf du posting dépasse 1, puis les tf - 2 de ces postings (la
+        plupart des tfs valent 1 et ne coûtent alors aucun octet)
+
+        la longueur de chaque liste et sa taille en octets sont codées en
+        variable-byte : les positions des listes et de leurs blocs en sont
+        déduites au chargement ; seules les listes de plus d'un bloc ont
+        des données de saut (dernier identifiant et position de fin de
+        chaque bloc dans la liste)
+
+        paramètres
+        ----------
+        ptr : np.array of int64, shape (n_lists + 1,)
+              positions de début et de fin de chaque liste dans ids et tfs
+        ids : np.array of int
+              identifiants, croissants au sein de chaque liste
+        tfs : np.array of int
+              nombres d'occurrences associés (au moins 1)
+        block_size : int (par défault BLOCK_SIZE)
+                     nombre de postings par bloc
+        renvoie
+        -------
+        sections : list of (string, np.array)
+                   sections à écrire dans le fichier de l'index
+    '''
+    ptr = np.asarray(ptr, dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+    tfs = np.asarray(tfs, dtype=np.int64)
+    lengths = np.diff(ptr)
+    blk_ptr, blk_start, blk_end = split_blocks(ptr, block_size)
+    n_blocks = np.diff(blk_ptr)
+
+    gaps = ids.copy()
+    gaps[1:] -= ids[:-1]
+    gaps[ptr[:-1][lengths > 0]] = ids[ptr[:-1][lengths > 0]]
+    flags = tfs > 1
+
+    # valeurs du flux, bloc par bloc : écarts, puis tfs des postings marqués
+    block = np.repeat(np.arange(len(blk_start)), blk_end - blk_start)
+    values = np.concatenate((2 * gaps + flags, tfs[flags] - 2))
+    owner = np.concatenate((block, block[flags]))
+    order = np.lexsort((np.arange(len(values)) >= len(gaps), owner))
+    data = vbyte_encode(values[order])
+
+    # position de fin de chaque bloc et de chaque liste dans le flux
+    value_ends = np.flatnonzero(data & 0x80) + 1
+    blk_byte_end = np.zeros(len(blk_start) + 1, dtype=np.int64)
+    blk_byte_end[1:] = value_ends[np.cumsum(np.bincount(owner, minlength=len(blk_start))) - 1]
+    byte_ptr = blk_byte_end[blk_ptr]
+    multi = np.repeat(n_blocks > 1, n_blocks)
+    list_start = np.repeat(byte_ptr[:-1], n_blocks)
+
+    return [
+        ("len_data", vbyte_encode(lengths)),
+        ("size_data", vbyte_encode(np.diff(byte_ptr))),
+        ("blk_last", narrow(ids[blk_end - 1][multi])),
+        ("blk_off", narrow((blk_byte_end[1:] - list_start)[multi])),
+        ("data", data),
+    ]
+
+class CompressedPostings:
+    '''
+        accès aux listes de postings compressées par encode_postings
+    '''
+    def __init__(self, sections, prefix="", block_size=BLOCK_SIZE):
+        '''
+            paramètres
+            ----------
+            sections : dict of string -> np.array
+                       sections lues dans le fichier de l'index
+            prefix : string (par défault "")
+                     préfixe des noms de sections
+            block_size : int (par défault BLOCK_SIZE)
+                         nombre de postings par bloc utilisé à l'encodage
+
+            stocke
+            ------
+            self.ptr : np.array of int64
+                       positions de début et de fin de chaque liste (en
+                       postings), déduites des longueurs des listes
+            self.byte_ptr : np.array of int64
+                            positions de début et de fin de chaque liste
+                            dans le flux
+            self.blk_ptr : np.array of int64
+                           premier bloc de chaque liste
+            self.skip_ptr : np.array of int64
+                            première entrée de chaque liste dans les
+                            données de saut (listes de plus d'un bloc)
+            self.blk_last : np.array of uint32
+                            dernier identifiant de chaque bloc
+            self.blk_off : np.array of uint32
+                           position de fin de chaque bloc dans sa liste
+            self.data : np.array of uint8
+                        flux des écarts et des tfs
+        '''
+        lengths = vbyte_decode(sections[prefix + "len_data"])
+        sizes = vbyte_decode(sections[prefix + "size_data"])
+        n_blocks = (lengths + block_size - 1) // block_size
+        self.block_size = block_size
+        self.ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        self.ptr[1:] = np.cumsum(lengths)
+        self.byte_ptr = np.zeros(len(sizes) + 1, dtype=np.int64)
+        self.byte_ptr[1:] = np.cumsum(sizes)
+        self.blk_ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        self.blk_ptr[1:] = np.cumsum(n_blocks)
+        self.skip_ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        self.skip_ptr[1:] = np.cumsum(np.where(n_blocks > 1, n_blocks, 0))
+        self.blk_last = sections[prefix + "blk_last"]
+        self.blk_off = sections[prefix + "blk_off"]
+        self.data = sections[prefix + "data"]
+
+    def blocks(self, j):
+        '''
+            paramètres
+            ----------
+            j : int
+                numéro d'une liste
+            renvoie
+            -------
+            range des numéros des blocs de la liste j
+        '''
+        return range(self.blk_ptr[j], self.blk_ptr[j+1])
+
+    def _decode(self, start, end, counts, base):
+        '''
+            décode les octets start à end - 1 du flux, qui contiennent des
+            blocs consécutifs d'une même liste de counts postings chacun,
+            base étant le dernier identifiant qui les précède
+        '''
+        values = vbyte_decode(self.data[start:end])
+        gaps = [np.zeros(0, dtype=np.int64)]
+        tfs = [np.zeros(0, dtype=np.int64)]
+        p = 0
+        for m in counts:
+            main = values[p:p+m]
+            flags = (main & 1) == 1
+            n_extra = np.count_nonzero(flags)
+            block_tfs = np.ones(m, dtype=np.int64)
+            block_tfs[flags] = values[p+m:p+m+n_extra] + 2
+            p += m + n_extra
+            gaps.append(main >> 1)
+            tfs.append(block_tfs)
+        ids = np.cumsum(np.concatenate(gaps)) + base
+        return ids, np.concatenate(tfs)
+
+    def block_counts(self, j, first, last):
+        '''
+            nombres de postings des blocs first à last - 1 de la liste j
+        '''
+        counts = np.full(last - first, self.block_size, dtype=np.int64)
+        if last == self.blk_ptr[j+1] and last > first:
+            counts[-1] = self.ptr[j+1] - self.ptr[j] - (last - 1 - self.blk_ptr[j]) * self.block_size
+        return counts.tolist()
+
+    def decode(self, j):
+        '''
+            décode une liste entière
+
+            paramètres
+            ----------
+            j : int
+                numéro d'une liste
+            renvoie
+            -------
+            ids : np.array of int64
+                  identifiants de la liste, croissants
+            tfs : np.array of int64
+                  nombres d'occurrences associés
+        '''
+        return self._decode(self.byte_ptr[j], self.byte_ptr[j+1],\
+                self.block_counts(j, self.blk_ptr[j], self.blk_ptr[j+1]), 0)
+
+    def decode_block(self, j, b):
+        '''
+            décode un seul bloc d'une liste grâce aux données de saut
+
+            paramètres
+            ----------
+            j : int
+                numéro de la liste
+            b : int
+                numéro (global) du bloc, dans self.blocks(j)
+            renvoie
+            -------
+            ids, tfs : np.array of int64
+                       identifiants et nombres d'occurrences du bloc
+        '''
+        first = self.blk_ptr[j]
+        if self.blk_ptr[j+1] - first == 1:
+            return self.decode(j)
+        skip = self.skip_ptr[j] + (b - first)
+        start = self.byte_ptr[j] + (int(self.blk_off[skip-1]) if b > first else 0)
+        base = int(self.blk_last[skip-1]) if b > first else 0
+        return self._decode(start, self.byte_ptr[j] + int(self.blk_off[skip]),\
+                self.block_counts(j, b, b+1), base)
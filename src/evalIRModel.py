@@ -46,9 +46,10 @@ class EvalIRModel:
         '''
         allQueries_dict = qParser.getJudgementsCollection()
         all_evals = []
+        # classements de toutes les requêtes calculés en un seul lot
+        rankings = self.model.getRankingBatch([query.get_text() for query in allQueries_dict.values()])
 
-        for (idQ, query) in allQueries_dict.items():
-            model_ranking = self.model.getRanking(query.get_text())
+        for ((idQ, query), model_ranking) in zip(allQueries_dict.items(), rankings):
             model_ranking = np.array(model_ranking)[:,0] # récupération des id
             score = self.mesure.evalQuery(model_ranking, query)
             if verbose:
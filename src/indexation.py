@@ -3,29 +3,396 @@
 
 import TextRepresenter
 import collections
+import hashlib
+import heapq
+import itertools
 import math
-import copy
+import mmap
+import os
+import re
+import struct
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+from parsing import Document, DocumentStore, CitationIndex, build_citations, invert_links
+from compression import encode_postings, CompressedPostings
+
+# format binaire de l'index (little-endian) :
+#   en-tête : magic, version, nombre de sections, N, V, nombre de postings,
+#             somme des longueurs des documents
+#   table des sections : nom, dtype numpy, position et nombre d'éléments
+#   données : tableaux contigus, alignés sur ALIGN octets
+MAGIC = b"RIINDEX\0"
+VERSION = 1
+ALIGN = 64
+HEADER = struct.Struct("<8sII4Q")
+SECTION = struct.Struct("<16s8sQQ")
+# taille des morceaux écrits d'un coup (les sections projetées depuis le
+# disque ne sont jamais chargées entièrement)
+WRITE_CHUNK = 1 << 24
+
+# mots d'un texte, comptés avant suppression des mots vides
+WORDS = re.compile(r"\w+")
+
+class QueryAnalyzer:
+    '''
+        analyse des requêtes par le même traitement que les documents
+        (IndexerSimple.tokenize_count : découpage en mots, mots vides,
+        racinisation de Porter), avec un cache LRU borné indexé par le
+        texte de la requête : une requête déjà vue n'est ni découpée ni
+        racinisée à nouveau
+    '''
+    def __init__(self, indexer, maxsize=1024):
+        '''
+            paramètres
+            ----------
+            indexer : object IndexerSimple
+                      index dont le traitement des textes est utilisé
+            maxsize : int (par défault 1024)
+                      nombre maximal de requêtes conservées
+
+            stocke
+            ------
+            self.indexer, self.maxsize : les paramètres sus-mentionnés
+            self.cache : collections.OrderedDict of string -> (dict of string -> int)
+                         analyses des dernières requêtes, de la moins
+                         récemment utilisée à la plus récente
+            self.hits, self.misses : int
+                                     nombres de requêtes trouvées et non
+                                     trouvées dans le cache
+        '''
+        self.indexer = indexer
+        self.maxsize = maxsize
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, query):
+        '''
+            paramètres
+            ----------
+            query : string
+                    texte de la requête
+            renvoie
+            -------
+            tfs : dict of string -> int
+                  dictionnaire associant à chaque terme de la requête son
+                  nombre d'occurrences (à ne pas modifier : il est partagé
+                  par le cache)
+        '''
+        tfs = self.cache.get(query)
+        if tfs is not None:
+            self.hits += 1
+            self.cache.move_to_end(query)
+            return tfs
+        self.misses += 1
+        tfs = self.indexer.tokenize_count(query)
+        self.cache[query] = tfs
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return tfs
+
+    def clear(self):
+        '''
+            vide le cache
+        '''
+        self.cache.clear()
+
+class Postings:
+    '''
+        listes (de postings ou de termes) non compressées, stockées de
+        manière contiguë : la liste j occupe ids[ptr[j]:ptr[j+1]]
+    '''
+    def __init__(self, ptr, ids, tfs):
+        '''
+            paramètres
+            ----------
+            ptr : np.array of int64, shape (n_lists + 1,)
+                  positions de début et de fin de chaque liste
+            ids : np.array of int32
+                  identifiants (rangs de documents ou de termes)
+            tfs : np.array of int32
+                  nombres d'occurrences associés
+
+            stocke
+            ------
+            self.ptr, self.ids, self.tfs : les paramètres sus-mentionnés
+        '''
+        self.ptr = ptr
+        self.ids = ids
+        self.tfs = tfs
+
+    def decode(self, j):
+        '''
+            paramètres
+            ----------
+            j : int
+                numéro d'une liste
+            renvoie
+            -------
+            ids, tfs : np.array
+                       vues (sans copie) sur la liste j
+        '''
+        start, end = self.ptr[j], self.ptr[j+1]
+        return self.ids[start:end], self.tfs[start:end]
+
+class ImpactPostings:
+    '''
+        listes de postings ordonnées par impact : les postings de chaque
+        terme sont triés par impact quantifié décroissant (puis par numéro
+        d'ordre de document) et regroupés en segments de même impact ;
+        le segment s contient les documents docs[seg_start[s]:seg_start[s+1]]
+        d'impact seg_impact[s] * scale
+    '''
+    def __init__(self, seg_ptr, seg_impact, seg_start, docs, scale):
+        '''
+            paramètres
+            ----------
+            seg_ptr : np.array of int64, shape (V + 1,)
+                      premier segment de chaque terme
+            seg_impact : np.array of int64
+                         impact quantifié de chaque segment
+            seg_start : np.array of int64
+                        positions de début et de fin de chaque segment
+            docs : np.array of int32
+                   numéros d'ordre des documents
+            scale : float
+                    pas de quantification
+
+            stocke
+            ------
+            self.seg_ptr, self.seg_impact, self.seg_start, self.docs,
+            self.scale : les paramètres sus-mentionnés
+        '''
+        self.seg_ptr = seg_ptr
+        self.seg_impact = seg_impact
+        self.seg_start = seg_start
+        self.docs = docs
+        self.scale = scale
+
+class IndexDocumentStore(DocumentStore):
+    '''
+        documents lus dans les sections text et links d'un index binaire
+        (voir IndexerSimple.save_binary), décodés à l'accès
+    '''
+    def __init__(self, doc_ids, sections, doc_ord=None):
+        '''
+            paramètres
+            ----------
+            doc_ids : np.array of int64
+                      identifiants des documents
+            sections : dict of string -> np.array
+                       tableaux du fichier binaire de l'index
+            doc_ord : dict of int -> int (par défault None)
+                      numéro d'ordre de chaque identifiant
+
+            stocke
+            ------
+            self.text_ptr, self.text, self.link_ptr, self.links :
+                      sections correspondantes du fichier (vues sans copie)
+        '''
+        super().__init__(doc_ids, doc_ord)
+        self.text_ptr = sections["text_ptr"]
+        self.text = sections["text"]
+        self.link_ptr = sections["link_ptr"]
+        self.links = sections["links"]
+
+    def load(self, k):
+        text = self.text[self.text_ptr[k]:self.text_ptr[k+1]].tobytes().decode("utf-8")
+        links = self.links[self.link_ptr[k]:self.link_ptr[k+1]].tolist()
+        return Document(int(self.doc_ids[k]), text, links)
+
+def postings_arrays(postings, n):
+    '''
+        renvoie le contenu de listes sous forme de trois tableaux contigus
+
+        paramètres
+        ----------
+        postings : object Postings ou CompressedPostings
+        n : int
+            nombre de listes
+        renvoie
+        -------
+        ptr : np.array of int64, shape (n + 1,)
+        ids : np.array of int32
+        tfs : np.array of int32
+              tableaux tels que la liste j occupe ids[ptr[j]:ptr[j+1]]
+              (sans copie pour des listes non compressées)
+    '''
+    if isinstance(postings, Postings):
+        return postings.ptr, postings.ids, postings.tfs
+    decoded = [postings.decode(j) for j in range(n)]
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(ids) for (ids, tfs) in decoded])
+    ids = np.concatenate([ids for (ids, tfs) in decoded] + [[]]).astype(np.int32)
+    tfs = np.concatenate([tfs for (ids, tfs) in decoded] + [[]]).astype(np.int32)
+    return ptr, ids, tfs
+
+def tokenize_shard(texts, analyzer):
+    '''
+        tokenise une partie de la collection ; les termes sont numérotés
+        localement dans l'ordre de leur première apparition
+
+        fonction de module pour pouvoir être exécutée dans un processus
+        de ProcessPoolExecutor
+
+        paramètres
+        ----------
+        texts : list of string
+                textes des documents de la partie
+        analyzer : object TextRepresenter
+                   traitement des textes
+        renvoie
+        -------
+        terms : list of string
+                termes de la partie, dans l'ordre de leur numéro local
+        doc_ptr : np.array of int64, shape (len(texts) + 1,)
+                  positions de début et de fin de la liste de termes de
+                  chaque document dans doc_terms
+        doc_terms : np.array of int32
+                    numéros locaux des termes de chaque document
+        doc_tfs : np.array of int32
+                  nombres d'occurrences associés
+        doc_words : np.array of int64
+                    nombre de mots de chaque document
+    '''
+    term_ids = dict()
+    doc_ptr = [0]
+    doc_terms = []
+    doc_tfs = []
+    doc_words = []
+
+    for text in texts:
+        doc_words.append(len(WORDS.findall(text)))
+        for (token, occ) in analyzer.getTextRepresentation(text.lower()).items():
+            j = term_ids.get(token)
+            if j is None:
+                j = term_ids[token] = len(term_ids)
+            doc_terms.append(j)
+            doc_tfs.append(occ)
+        doc_ptr.append(len(doc_terms))
+
+    return (list(term_ids), np.asarray(doc_ptr, dtype=np.int64), np.asarray(doc_terms, dtype=np.int32),
+            np.asarray(doc_tfs, dtype=np.int32), np.asarray(doc_words, dtype=np.int64))
+
+def merge_shards(shards):
+    '''
+        fusionne les parties renvoyées par tokenize_shard, dans l'ordre :
+        les numéros locaux des termes sont traduits en numéros globaux et
+        les positions des documents décalées
+
+        paramètres
+        ----------
+        shards : list of tuple
+                 résultats de tokenize_shard
+        renvoie
+        -------
+        terms, doc_ptr, doc_terms, doc_tfs, doc_words
+            arguments de IndexerSimple.build pour la collection entière
+    '''
+    term_ids = dict()
+    doc_ptr = [np.zeros(1, dtype=np.int64)]
+    doc_terms = []
+    offset = 0
+    for (terms, ptr, local_terms, tfs, words) in shards:
+        remap = np.array([term_ids.setdefault(token, len(term_ids)) for token in terms], dtype=np.int32)
+        doc_terms.append(remap[local_terms] if len(local_terms) else local_terms)
+        doc_ptr.append(ptr[1:] + offset)
+        offset += ptr[-1]
+    return (list(term_ids), np.concatenate(doc_ptr), np.concatenate(doc_terms),
+            np.concatenate([shard[3] for shard in shards]), np.concatenate([shard[4] for shard in shards]))
 
 class IndexerSimple:
     '''
         permet de construire les fichiers index d'une collection parsée
 
-        stocke le nom du fichier source, la collection, l'index, l'index
-        inversé, l'index normalisé, l'index inversé normalisé, le df, le
-        tf_idf, et le nombre de documents de la collection
+        les termes et les documents sont numérotés : un terme est
+        identifié par son rang dans le dictionnaire des termes trié
+        self.terms, un document par son rang dans self.doc_ids ; l'index
+        et l'index inversé sont stockés sous forme de tableaux contigus
+        et les statistiques dans des tableaux indexés par ces rangs
+
+        l'index, l'index inversé, leurs versions normalisées, le df, le
+        tf_idf et les longueurs des documents sous forme de dictionnaires
+        ne sont construits qu'au premier appel de leur accesseur
     '''
-    def __init__(self, source):
+    def __init__(self, source, analyzer=None):
         '''
             paramètres
             ----------
             source : string
                     nom du fichier contenant la collection
+            analyzer : object TextRepresenter (par défault None)
+                       traitement des textes (découpage, mots vides,
+                       racinisation), construit une seule fois et
+                       réutilisé pour tous les documents et requêtes ;
+                       TextRepresenter.PorterStemmer() si None
             stocke
             ------
             self.source : défini par le paramètre source
+            self.analyzer : défini par le paramètre analyzer
             self.collection : dict int -> Document
                               dictionnaire associant à chaque identifiant de
-                              document l'objet Document correspondant
+                              document l'objet Document correspondant (un
+                              IndexDocumentStore, qui lit les documents à
+                              l'accès, pour un index chargé par load_binary)
+            self.terms : list of string
+                         dictionnaire des termes de la collection, trié ;
+                         le rang d'un terme dans cette liste est son
+                         identifiant
+            self.term_ids : dict of string -> int
+                            dictionnaire associant à chaque terme son
+                            identifiant
+            self.doc_ids : np.array of int64
+                           identifiants des documents, dans l'ordre de la
+                           collection ; le rang d'un document dans ce
+                           tableau est son numéro d'ordre
+            self.doc_ord : dict of int -> int
+                           dictionnaire associant à chaque identifiant de
+                           document son numéro d'ordre
+            self.postings : object Postings ou CompressedPostings
+                            index inversé : pour chaque identifiant de
+                            terme, numéros d'ordre des documents qui le
+                            contiennent et nombres d'occurrences
+            self.doc_terms : object Postings ou CompressedPostings
+                             index : pour chaque numéro d'ordre de document,
+                             identifiants (croissants) des termes qu'il
+                             contient et nombres d'occurrences
+            self.term_df : np.array of int64
+                           nombre de documents contenant chaque terme
+            self.doc_lengths : np.array of int64
+                               somme des nombres d'occurrences des tokens
+                               de chaque document
+            self.doc_words : np.array of int64
+                             nombre de mots de chaque document, mots vides
+                             compris (None s'il n'est pas connu)
+            self.matrix : scipy.sparse.csr_matrix, shape (N, V)
+                          matrice documents x termes des nombres
+                          d'occurrences (construite au premier appel de
+                          get_matrix)
+            self.matrix_inverse : scipy.sparse.csr_matrix, shape (V, N)
+                                  sa transposée, termes x documents
+                                  (construite au premier appel de
+                                  get_matrix_inverse)
+            self.sections : dict of string -> np.array
+                            tableaux du fichier binaire dont l'index a été
+                            chargé par load_binary (None sinon)
+            self.N : int
+                     nombre de documents dans la collection
+            self.version : string
+                           empreinte du contenu de l'index (calculée au
+                           premier appel de get_version)
+            self.query_analyzer : object QueryAnalyzer
+                                  analyse (mise en cache) des requêtes,
+                                  partagée par les pondérations et les modèles
+            self.citations : object CitationIndex
+                             hyperliens sortants et entrants des documents
+                             (construit à l'indexation, lu dans le fichier
+                             binaire au premier appel de getCitations)
+
+            vues construites à la demande
+            -----------------------------
             self.index : dict of int -> (dict of string -> int)
                          dictionnaire associant à chaque identifiant de document
                          un dictionnaire associant à chaque token le constituant
@@ -50,18 +417,66 @@ class IndexerSimple:
                           dictionnaire associant à chaque token de la collection
                           un dictionnaire faisant correspondre à chaque document
                           où il apparaît son tf-idf
-            self.N : int
-                     nombre de documents dans la collection
+            self.doc_len : dict of int -> int
+                           dictionnaire associant à chaque identifiant de
+                           document la somme des nombres d'occurrences de
+                           ses tokens
+            (None tant que l'accesseur correspondant n'a pas été appelé)
         '''
         self.source = source
+        self.analyzer = analyzer if analyzer is not None else TextRepresenter.PorterStemmer()
         self.collection = None
+        self.terms = None
+        self.term_ids = None
+        self.doc_ids = None
+        self.doc_ord = None
+        self.postings = None
+        self.doc_terms = None
+        self.term_df = None
+        self.doc_lengths = None
+        self.doc_words = None
+        self.matrix = None
+        self.matrix_inverse = None
+        self.sections = None
+        self.N = None
+        self.version = None
+        self.query_analyzer = QueryAnalyzer(self)
+        self.citations = None
         self.index = None
         self.index_inverse = None
         self.index_norm = None
         self.index_inverse_norm = None
         self.df = None
         self.tf_idf = None
-        self.N = None
+        self.doc_len = None
+
+    def __setstate__(self, state):
+        '''
+            restaure un index sérialisé par pickle : les attributs ajoutés
+            depuis sa sérialisation (analyse des requêtes notamment)
+            prennent leur valeur par défaut ; les tableaux d'un index
+            sérialisé avant leur introduction sont reconstruits à partir
+            de l'index (dictionnaires) et de la collection sérialisés
+        '''
+        self.__init__(state["source"])
+        self.__dict__.update(state)
+        if self.postings is None and self.index is not None:
+            index = self.index
+            term_ids = dict()
+            doc_ptr = [0]
+            doc_terms = []
+            doc_tfs = []
+            for tokens in index.values():
+                for (token, occ) in tokens.items():
+                    doc_terms.append(term_ids.setdefault(token, len(term_ids)))
+                    doc_tfs.append(occ)
+                doc_ptr.append(len(doc_terms))
+            doc_words = None
+            if self.collection is not None:
+                doc_words = [len(WORDS.findall(self.collection[i].get_text())) for i in index]
+            self.build(list(index), list(term_ids), doc_ptr, doc_terms, doc_tfs, doc_words)
+            if self.collection is not None:
+                self.citations = build_citations(list(index), [self.collection[i].get_hyperlinks() for i in index])
 
     def tokenize_count(self, ch):
         '''
@@ -78,126 +493,154 @@ class IndexerSimple:
                      dictionnaire associant à chaque token du texte
                      son nombre d'occurrences
         '''
-        tokens = ch.lower()
-        porter = TextRepresenter.PorterStemmer()
-        tokens = porter.getTextRepresentation(tokens)
+        return self.analyzer.getTextRepresentation(ch.lower())
 
-        return tokens
-
-    def normalise(self, doc, index_inverse_norm, id_doc):
+    def indexation(self, collection, save=True, workers=None, shards_per_worker=4):
         '''
-            normalise la valeur associée à un document dans un index,
-            et les entrées d'un index inversé normalisé associées aux
-            tokens du document
+            indexe la collection passée en paramètre
+            sauvegarde les index créés dans des fichiers
+
+            un passage sur les documents attribue un identifiant à chaque
+            nouveau terme et remplit l'index ; l'index inversé, le df et
+            les longueurs des documents en sont déduits par des opérations
+            vectorisées : le coût est linéaire en le nombre de postings de
+            la collection
+
+            avec plusieurs processus, la collection est découpée en parties
+            contiguës tokenisées en parallèle (tokenize_shard) puis
+            fusionnées dans l'ordre de la collection (merge_shards) :
+            l'index obtenu est identique à celui de l'indexation séquentielle
 
             paramètres
             ----------
-            doc : dict of string -> int
-                  dictionnaire associant à chaque token son nombre
-                  d'occurrences dans le document d'identifiant id_doc
-            index_inverse_norm : dict of string -> (dict of int -> float)
-                                 index inversé normalisé
-            id_doc : int
-                     identifiant d'un document
-
-            renvoie
-            -------
-            doc_normalise : dict of string -> float
-                            dictionnaire doc dont les valeurs sont
-                            normalisées
-            index_inverse_norm : dict of string -> (dict of int -> float)
-                                 index inversé normalisé dans lequel sont
-                                 rajoutées les fréquences d'occurrences des
-                                 tokens de doc dans le document id_doc
+            collection : dict of int -> Document
+                         dictionnaire associant à chaque identifiant d'un document
+                         l'objet Document associé
+            save : boolean (par défault True)
+                   True si l'on souhaite écrire les index dans des fichiers
+            workers : int (par défault None)
+                      nombre de processus ; None ou 1 pour indexer dans le
+                      processus courant
+            shards_per_worker : int (par défault 4)
+                                nombre de parties par processus, pour
+                                équilibrer leur charge
         '''
-        doc_normalise = dict()
-        n=sum(list(doc.values()))
-        for token,occ in doc.items():
-            doc_normalise[token]=occ/n
-            index_inverse_norm[token][id_doc]=occ/n
-        return doc_normalise,index_inverse_norm
+        docs = list(collection.values())
+        texts = [doc.get_text() for doc in docs]
+        if workers is None or workers <= 1 or len(texts) < 2:
+            shards = [tokenize_shard(texts, self.analyzer)]
+        else:
+            n_shards = min(workers * shards_per_worker, len(texts))
+            bounds = np.linspace(0, len(texts), n_shards + 1).astype(np.int64)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                shards = list(executor.map(tokenize_shard, [texts[a:b] for (a, b) in zip(bounds[:-1], bounds[1:])],\
+                        [self.analyzer] * n_shards))
 
-    def normalise_index(self,index, index_inverse):
+        self.build(list(collection), *merge_shards(shards))
+        self.collection = collection
+        self.citations = build_citations(list(collection), [doc.get_hyperlinks() for doc in docs])
+
+        if save:
+            self.save_text()
+
+        print("Indexation de la collection {} achevée".format(self.source))
+
+    def build(self, doc_ids, terms, doc_ptr, doc_terms, doc_tfs, doc_words=None):
         '''
-            normalise l'index et l'index inversé passés en paramètres
+            construit les tableaux de l'index à partir de l'index
+            (listes de termes de chaque document)
 
             paramètres
             ----------
-            index : dict of int -> (dict of string -> int)
-                    index d'une collection
-            index_inverse : dict of string -> (dict of int -> int)
-                            index inversé d'une collection
-
-            renvoie
-            -------
-            self.index_norm : dict of int -> (dict of string -> float)
-                              index normalisé
-            self.index_inverse_norm : dict of string -> (dict of int -> float)
-                                      index inversé normalisé
+            doc_ids : list of int
+                      identifiants des documents
+            terms : list of string
+                    termes de la collection, dans un ordre quelconque
+            doc_ptr : list of int, len(doc_ids) + 1
+                      positions de début et de fin de la liste de termes
+                      de chaque document dans doc_terms
+            doc_terms : list of int
+                        rangs dans terms des termes de chaque document
+            doc_tfs : list of int
+                      nombres d'occurrences associés
+            doc_words : list of int (par défault None)
+                        nombre de mots de chaque document
         '''
-        index_norm=dict()
-        index_inverse_norm = copy.deepcopy(index_inverse)
-        for id_doc,dict_tokens in index.items():
-            index_norm[id_doc], index_inverse_norm = self.normalise(dict_tokens,\
-                    index_inverse_norm,id_doc)
-        return index_norm,index_inverse_norm
+        V = len(terms)
+        N = len(doc_ids)
+        order = sorted(range(V), key=terms.__getitem__)
+        remap = np.empty(V, dtype=np.int32)
+        remap[order] = np.arange(V, dtype=np.int32)
+
+        doc_ptr = np.asarray(doc_ptr, dtype=np.int64)
+        doc_terms = remap[np.asarray(doc_terms, dtype=np.int64)]
+        doc_tfs = np.asarray(doc_tfs, dtype=np.int32)
+        owner = np.repeat(np.arange(N, dtype=np.int32), np.diff(doc_ptr))
 
-    def indexation(self, collection):
+        # tri stable par terme : les postings de chaque terme restent
+        # dans l'ordre de la collection
+        perm = np.argsort(doc_terms, kind="stable")
+        # puis tri stable par document : les termes de chaque document
+        # sont rangés par identifiant croissant, comme dans l'index
+        # compressé et l'index construit par index_spimi
+        fwd = perm[np.argsort(owner[perm], kind="stable")]
+        term_df = np.bincount(doc_terms, minlength=V).astype(np.int64)
+        postings_ptr = np.zeros(V + 1, dtype=np.int64)
+        postings_ptr[1:] = np.cumsum(term_df)
+
+        self.terms = [terms[j] for j in order]
+        self.term_ids = {token: j for (j, token) in enumerate(self.terms)}
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.doc_ord = {i: k for (k, i) in enumerate(doc_ids)}
+        self.postings = Postings(postings_ptr, owner[perm], doc_tfs[perm])
+        self.doc_terms = Postings(doc_ptr, doc_terms[fwd], doc_tfs[fwd])
+        self.term_df = term_df
+        self.doc_lengths = np.bincount(owner, weights=doc_tfs, minlength=N).astype(np.int64)
+        self.doc_words = None if doc_words is None else np.asarray(doc_words, dtype=np.int64)
+        self.matrix = None
+        self.matrix_inverse = None
+        self.N = N
+        self.version = None
+        self.query_analyzer.clear()
+        self.citations = None
+        self.index = None
+        self.index_inverse = None
+        self.index_norm = None
+        self.index_inverse_norm = None
+        self.df = None
+        self.tf_idf = None
+        self.doc_len = None
+
+    def save_text(self):
         '''
-            indexe la collection passée en paramètre
-            sauvegarde les index créés dans des fichiers
+            sauvegarde l'index et l'index inversé dans les fichiers
+            ../index/<source>_index.txt et ../index/<source>_index_inverse.txt
+        '''
+        with open("../index/" + self.source[:-4] + "_index.txt", "w") as f_index:
+            for (i, tokens) in self.get_index().items():
+                f_index.write("{'" + str(i) + "': " + str(tokens) + "}\n")
+        with open("../index/" + self.source[:-4] + "_index_inverse.txt", "w") as f_index_inverse:
+            for (token, postings) in self.get_index_inverse().items():
+                f_index_inverse.write("{'" + token + "': " + str(postings) + "}\n")
 
+    def idf(self, token):
+        '''
             paramètres
             ----------
-            collection : dict of int -> Document
-                         dictionnaire associant à chaque identifiant d'un document
-                         l'objet Document associé
+            token : string
+                    token de la collection
+            renvoie
+            -------
+            idf : float
+                  idf lissé log((1+N)/(1+df)) du token
         '''
-        f_index = open("../index/" + self.source[:-4] + "_index.txt", "w")
-        f_index_inverse = open("../index/" + self.source[:-4] + "_index_inverse.txt", "w")
-        dict_index = dict()
-        dict_index_inverse = dict()
-        n = len(collection)
-        df = dict()
-        tf_idf = dict(dict())
-
-        for (i, doc) in collection.items():
-            text = doc.get_text()
-            dict_index[i] = dict(self.tokenize_count(text))
-
-            f_index.write("{'" + str(i) + "': " + str(dict_index[i]) + "}\n")
-            for token in dict_index[i] :
-                if token in dict_index_inverse.keys():
-                    dict_index_inverse[token][i]=dict_index[i][token]
-                    df[token] += 1
-                else:
-                    dict_index_inverse[token]={}
-                    dict_index_inverse[token][i]=dict_index[i][token]
-                    df[token] = 1
-
-        for token in df.keys():
-            f_index_inverse.write("{'" + token + "': " + str(dict_index_inverse[token]) + "}\n")
-            tf_idf[token] = {}
-            for (i, doc) in collection.items():
-                if token in dict_index[i]:
-                    tf_idf[token][i]=dict_index[i][token]*math.log((1+n)/(1+df[token]))
-
-        self.index = dict_index
-        self.index_inverse = dict_index_inverse
-        self.index_norm,self.index_inverse_norm= self.normalise_index(dict_index,\
-           self.index_inverse)
-        self.tf_idf = tf_idf
-        self.df = df
-        self.N = n
-        self.collection = collection
-
-        f_index.close()
-        f_index_inverse.close()
-
-        print("Indexation de la collection {} achevée".format(self.source))
+        return math.log((1+self.N)/(1+int(self.term_df[self.term_ids[token]])))
 
     def get_index(self, normalized=False):
         '''
+            l'index et l'index normalisé sont construits au premier appel
+            à partir des tableaux de l'index
+
             paramètres
             ----------
             normalized : boolean (par défault False)
@@ -208,13 +651,25 @@ class IndexerSimple:
                                        -> int/float)
                                        l'index de la collection
         '''
+        if self.index is None:
+            self.index = {i: self.getTfsForDocId(i) for i in self.doc_ids.tolist()}
         if normalized:
+            if self.index_norm is None:
+                doc_len = self.get_doc_len()
+                self.index_norm = dict()
+                for (i, tokens) in self.index.items():
+                    n = doc_len[i]
+                    self.index_norm[i] = {token: occ/n for (token, occ) in tokens.items()}
             return self.index_norm
         else:
             return self.index
 
     def get_index_inverse(self, normalized=False):
         '''
+            l'index inversé et l'index inversé normalisé sont construits
+            au premier appel à partir des listes de postings et des
+            longueurs des documents
+
             paramètres
             ----------
             normalized : boolean (par défault False)
@@ -226,7 +681,15 @@ class IndexerSimple:
                 dict of string -> (dict of int -> int/float)
                 l'index inversé de la collection
         '''
+        if self.index_inverse is None:
+            self.index_inverse = {token: self.getTfsForStem(token) for token in self.terms}
         if normalized:
+            if self.index_inverse_norm is None:
+                doc_len = self.get_doc_len()
+                self.index_inverse_norm = dict()
+                for (token, postings) in self.index_inverse.items():
+                    self.index_inverse_norm[token] = {i: occ/doc_len[i] for \
+                            (i, occ) in postings.items()}
             return self.index_inverse_norm
         else:
             return self.index_inverse
@@ -238,10 +701,15 @@ class IndexerSimple:
             self.df : dict of string -> int
                       le dictionnaire des Document Frequencies
         '''
+        if self.df is None:
+            self.df = dict(zip(self.terms, self.term_df.tolist()))
         return self.df
 
     def get_tfidf(self):
         '''
+            la table des tf-idf est calculée au premier appel à partir des
+            listes de postings et du df
+
             renvoie
             -------
             self.tfidf : dict of string -> (dict of int -> float)
@@ -249,8 +717,135 @@ class IndexerSimple:
                          tfidf pour chaque document dans lequel il
                          apparaît
         '''
+        if self.tf_idf is None:
+            self.tf_idf = {token: self.getTfIDFsForStem(token) for token in self.terms}
         return self.tf_idf
 
+    def get_matrix(self):
+        '''
+            renvoie
+            -------
+            self.matrix : scipy.sparse.csr_matrix, shape (N, V)
+                          matrice documents x termes des nombres
+                          d'occurrences ; la ligne k correspond au document
+                          self.doc_ids[k] et la colonne j au terme
+                          self.terms[j] ; les indices de colonne de chaque
+                          ligne sont triés (forme canonique), y compris
+                          pour un index lu dans un fichier plus ancien
+        '''
+        if self.matrix is None:
+            ptr, ids, tfs = postings_arrays(self.doc_terms, self.N)
+            self.matrix = sparse.csr_matrix((tfs, ids, ptr), shape=(self.N, len(self.terms)))
+            if not self.matrix.has_sorted_indices:
+                # copie : les tableaux d'un index projeté sont en lecture seule
+                self.matrix = self.matrix.sorted_indices()
+        return self.matrix
+
+    def get_matrix_inverse(self):
+        '''
+            renvoie
+            -------
+            self.matrix_inverse : scipy.sparse.csr_matrix, shape (V, N)
+                                  matrice termes x documents des nombres
+                                  d'occurrences, dont les lignes sont les
+                                  listes de postings
+        '''
+        if self.matrix_inverse is None:
+            ptr, ids, tfs = postings_arrays(self.postings, len(self.terms))
+            self.matrix_inverse = sparse.csr_matrix((tfs, ids, ptr), shape=(len(self.terms), self.N))
+            if not self.matrix_inverse.has_sorted_indices:
+                self.matrix_inverse = self.matrix_inverse.sorted_indices()
+        return self.matrix_inverse
+
+    def getTfsForQuery(self, query):
+        '''
+            paramètres
+            ----------
+            query : string
+                    requête
+            renvoie
+            -------
+            tfs : dict of string -> int
+                  dictionnaire associant à chaque terme de la requête son
+                  nombre d'occurrences (voir QueryAnalyzer.analyze)
+        '''
+        return self.query_analyzer.analyze(query)
+
+    def get_version(self):
+        '''
+            renvoie
+            -------
+            self.version : string
+                           empreinte (sha1) du dictionnaire des termes, des
+                           identifiants des documents et des listes de
+                           postings : deux index de même contenu ont la
+                           même version, quel que soit leur format
+        '''
+        if self.version is None:
+            digest = hashlib.sha1()
+            digest.update("\n".join(self.terms).encode("utf-8"))
+            digest.update(np.ascontiguousarray(self.doc_ids, dtype=np.int64).tobytes())
+            for array in postings_arrays(self.postings, len(self.terms)):
+                digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+            self.version = digest.hexdigest()
+        return self.version
+
+    def getImpactPostings(self, term_weights, bits=8):
+        '''
+            construit l'index ordonné par impact à partir de la contribution
+            de chaque posting au score (impact BM25, poids tf-idf, ...)
+
+            les contributions sont quantifiées sur bits bits avec un pas
+            commun à tous les termes ; les postings de contribution nulle
+            sont écartés
+
+            paramètres
+            ----------
+            term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                           matrice termes x documents des contributions
+                           (positives) des postings
+            bits : int (par défault 8)
+                   nombre de bits des impacts quantifiés
+            renvoie
+            -------
+            impacts : object ImpactPostings
+        '''
+        V = term_weights.shape[0]
+        rows = np.repeat(np.arange(V), np.diff(term_weights.indptr))
+        weights = term_weights.data
+        top = weights.max() if len(weights) else 0.
+        scale = top / (2**bits - 1) if top > 0 else 1.
+        impact = np.minimum(np.rint(weights / scale), 2**bits - 1).astype(np.int64)
+        impact[(impact == 0) & (weights > 0)] = 1
+        kept = impact > 0
+        rows, impact, docs = rows[kept], impact[kept], term_weights.indices[kept]
+
+        order = np.lexsort((docs, -impact, rows))
+        rows, impact, docs = rows[order], impact[order], docs[order].astype(np.int32)
+        changes = np.flatnonzero((rows[1:] != rows[:-1]) | (impact[1:] != impact[:-1])) + 1
+        seg_start = np.concatenate(([0], changes, [len(docs)])).astype(np.int64) if len(docs)\
+                else np.zeros(1, dtype=np.int64)
+        seg_ptr = np.searchsorted(rows[seg_start[:-1]], np.arange(V + 1)).astype(np.int64)
+        return ImpactPostings(seg_ptr, impact[seg_start[:-1]], seg_start, docs, scale)
+
+    def getTfsForDocId(self, i):
+        '''
+            paramètres
+            ----------
+            i : int
+                identifiant d'un document
+
+            renvoie
+            -------
+            tokens : dict of string -> int
+                     dictionnaire associant à chaque token du document
+                     son nombre d'apparition dans le document
+        '''
+        if self.index is not None:
+            return self.index[i]
+        ids, tfs = self.doc_terms.decode(self.doc_ord[i])
+        terms = self.terms
+        return {terms[j]: occ for (j, occ) in zip(ids.tolist(), tfs.tolist())}
 
     def getTfsForDoc(self, doc):
         '''
@@ -264,12 +859,12 @@ class IndexerSimple:
 
             renvoie
             -------
-            self.index[doc.get_id()] : dict of string -> int
-                                       dictionnaire associant à chaque token du
-                                       document son nombre d'apparition dans le
-                                       document
+            tokens : dict of string -> int
+                     dictionnaire associant à chaque token du
+                     document son nombre d'apparition dans le
+                     document
         '''
-        return self.index[doc.get_id()]
+        return self.getTfsForDocId(doc.get_id())
 
     def getTfIDFsForDoc(self, doc):
         '''
@@ -287,11 +882,28 @@ class IndexerSimple:
                 dictionnaire associant à chaque token du document son tf-idf
                 dans le document
         '''
-        d = dict()
-        i = doc.get_id()
-        for token in self.index[i]:
-            d[token] = self.tf_idf[token][i]
-        return d
+        return {token: occ*self.idf(token) for (token, occ) in self.getTfsForDoc(doc).items()}
+
+    def getPostingsForStem(self, stem):
+        '''
+            retourne les postings d'un stem sous forme de tableaux
+
+            paramètres
+            ----------
+            stem : string
+                   mot stemmé
+
+            renvoie
+            -------
+            docs : np.array of int
+                   numéros d'ordre (rangs dans self.doc_ids) des documents
+                   dans lesquels stem apparaît, par ordre croissant
+            tfs : np.array of int
+                  nombre d'occurrences de stem dans chacun de ces documents
+            les tableaux sont des vues sans copie sur l'index, sauf si
+            celui-ci est compressé
+        '''
+        return self.postings.decode(self.term_ids[stem])
 
     def getTfsForStem(self, stem):
         '''
@@ -305,17 +917,21 @@ class IndexerSimple:
 
             renvoie
             -------
-            self.index_inverse[stem] : dict of int -> int
-                                       dictionnaire associant à chaque document
-                                       dans lequel stem apparaît le nombre
-                                       d'occurrences de ce dernier
+            postings : dict of int -> int
+                       dictionnaire associant à chaque document
+                       dans lequel stem apparaît le nombre
+                       d'occurrences de ce dernier
         '''
-        return self.index_inverse[stem]
+        if self.index_inverse is not None:
+            return self.index_inverse[stem]
+        docs, tfs = self.getPostingsForStem(stem)
+        return dict(zip(self.doc_ids[docs].tolist(), tfs.tolist()))
 
     def getTfIDFsForStem(self, stem):
         '''
             retourne la représentation doc-tfidf d'un stem à partir de l'index
-            inversé
+            inversé (calculée à la volée si la table des tf-idf n'a pas été
+            construite)
 
             paramètres
             ----------
@@ -324,12 +940,27 @@ class IndexerSimple:
 
             renvoie
             -------
-            self.tf_idf[stem] : dict of int -> float
-                                dictionnaire associant à chaque document
-                                dans lequel stem apparaît le tf-idf de ce
-                                dernier
+            d : dict of int -> float
+                dictionnaire associant à chaque document dans lequel stem
+                apparaît le tf-idf de ce dernier
+        '''
+        if self.tf_idf is not None:
+            return self.tf_idf[stem]
+        idf = self.idf(stem)
+        return {i: occ*idf for (i, occ) in self.getTfsForStem(stem).items()}
+
+    def get_doc_len(self):
+        '''
+            renvoie
+            -------
+            self.doc_len : dict of int -> int
+                           dictionnaire associant à chaque identifiant de
+                           document la somme des nombres d'occurrences de
+                           ses tokens
         '''
-        return self.tf_idf[stem]
+        if self.doc_len is None:
+            self.doc_len = dict(zip(self.doc_ids.tolist(), self.doc_lengths.tolist()))
+        return self.doc_len
 
     def getStrDoc(self, doc):
         '''
@@ -349,12 +980,452 @@ class IndexerSimple:
 
     def getCollection(self):
         '''
-            récupère la collection
+            récupère la collection ; pour un index chargé par load_binary,
+            les documents sont lus dans le fichier à l'accès
 
             renvoie
             -------
-            self.collection : dict of int -> Document
+            self.collection : dict of int -> Document (ou IndexDocumentStore)
                               dictionnaire associant à chaque identifiant
                               d'un document l'objet Document associé
         '''
+        if self.collection is None and self.sections is not None:
+            self.collection = IndexDocumentStore(self.doc_ids, self.sections, self.doc_ord)
         return self.collection
+
+    def getCitations(self):
+        '''
+            renvoie
+            -------
+            self.citations : object CitationIndex
+                             hyperliens sortants et entrants des documents
+        '''
+        if self.citations is None:
+            if self.sections is not None:
+                sections = self.sections
+                cited = (sections["cited_ids"], sections["cited_ptr"], sections["cited_by"]) \
+                        if "cited_ids" in sections else None
+                self.citations = CitationIndex(self.doc_ids, sections["link_ptr"], sections["links"],\
+                        cited, self.doc_ord)
+            else:
+                collection = self.getCollection()
+                self.citations = build_citations(self.doc_ids.tolist(),\
+                        [collection[i].get_hyperlinks() for i in self.doc_ids.tolist()])
+        return self.citations
+
+    def getHyperlinksTo(self, id_doc):
+        '''
+            renvoie les documents citant un document (voir CitationIndex)
+
+            paramètres
+            ----------
+            id_doc : int
+                     identifiant d'un document
+            renvoie
+            -------
+            hyperlinks : int list
+                         documents citant le document d'identifiant id_doc
+        '''
+        return self.getCitations().getHyperlinksTo(id_doc)
+
+    def getHyperlinksFrom(self, id_doc):
+        '''
+            renvoie les documents cités par un document (voir CitationIndex)
+
+            paramètres
+            ----------
+            id_doc : int
+                     identifiant d'un document
+            renvoie
+            -------
+            hyperlinks : dict int -> float
+                         fréquence de chaque document cité par le document
+                         d'identifiant id_doc
+        '''
+        return self.getCitations().getHyperlinksFrom(id_doc)
+
+    def save_binary(self, fname=None, compress=False):
+        '''
+            sauvegarde l'index au format binaire : dictionnaire des termes,
+            listes de postings (index inversé) et listes de termes (index)
+            contiguës, table des longueurs des documents, textes et
+            hyperliens (sortants et entrants) des documents
+
+            paramètres
+            ----------
+            fname : string (par défault None)
+                    nom du fichier à écrire, ../index/<source>.bin si None
+            compress : boolean (par défault False)
+                       True pour compresser les listes de postings et de
+                       termes par blocs (écarts + variable-byte, voir
+                       compression.encode_postings)
+        '''
+        if fname is None:
+            fname = "../index/" + self.source[:-4] + ".bin"
+        collection = self.getCollection()
+        doc_ids = self.doc_ids.tolist()
+
+        lists = [("inv_",) + postings_arrays(self.postings, len(self.terms)),\
+                ("fwd_",) + postings_arrays(self.doc_terms, self.N)]
+
+        if compress:
+            # les termes de chaque document sont triés par identifiant pour
+            # être codés par écarts (c'est déjà le cas depuis build, pas
+            # forcément pour un index chargé d'un fichier plus ancien)
+            prefix, ptr, ids, tfs = lists[1]
+            owner = np.repeat(np.arange(self.N), np.diff(ptr))
+            order = np.lexsort((ids, owner))
+            lists[1] = (prefix, ptr, ids[order], tfs[order])
+            # les pointeurs des listes sont déduits des longueurs codées
+            # dans les sections compressées
+            postings = [(prefix + name, array) for (prefix, ptr, ids, tfs) in lists\
+                    for (name, array) in encode_postings(ptr, ids, tfs)]
+        else:
+            postings = [("inv_ptr", lists[0][1]), ("fwd_ptr", lists[1][1]),\
+                    ("inv_docs", lists[0][2]), ("inv_tfs", lists[0][3]),\
+                    ("fwd_terms", lists[1][2]), ("fwd_tfs", lists[1][3])]
+
+        texts = [collection[i].get_text().encode("utf-8") for i in doc_ids]
+        text_ptr = np.zeros(self.N + 1, dtype=np.int64)
+        text_ptr[1:] = np.cumsum([len(t) for t in texts])
+        citations = self.getCitations()
+
+        sections = [
+            ("source", np.frombuffer(self.source.encode("utf-8"), dtype=np.uint8)),
+            ("doc_ids", self.doc_ids),
+            ("doc_len", self.doc_lengths),
+        ] + ([] if self.doc_words is None else [("doc_words", self.doc_words)]) + [
+            ("terms", np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8)),
+        ] + postings + [
+            ("text_ptr", text_ptr),
+            ("text", np.frombuffer(b"".join(texts), dtype=np.uint8)),
+            ("link_ptr", citations.link_ptr),
+            ("links", citations.links),
+            ("cited_ids", citations.cited_ids),
+            ("cited_ptr", citations.cited_ptr),
+            ("cited_by", citations.cited_by),
+        ]
+        write_sections(fname, sections, (self.N, len(self.terms), int(lists[0][1][-1]),\
+                int(self.doc_lengths.sum())))
+
+def write_sections(fname, sections, stats):
+    '''
+        écrit des tableaux numpy dans un fichier au format binaire de
+        l'index
+
+        paramètres
+        ----------
+        fname : string
+                nom du fichier à écrire
+        sections : list of (string, np.array)
+                   noms et contenus des sections
+        stats : tuple of int
+                N, V, nombre de postings, somme des longueurs des documents
+    '''
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for (name, array) in sections:
+        offset += -offset % ALIGN
+        table.append((name, array, offset))
+        offset += array.nbytes
+
+    with open(fname, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sections), *stats))
+        for (name, array, offset) in table:
+            f.write(SECTION.pack(name.encode("ascii"), array.dtype.str.encode("ascii"),\
+                    offset, array.size))
+        for (name, array, offset) in table:
+            f.write(b"\0" * (offset - f.tell()))
+            array = np.ascontiguousarray(array)
+            step = max(WRITE_CHUNK // max(array.itemsize, 1), 1)
+            for start in range(0, array.size, step):
+                f.write(array[start:start+step].tobytes())
+
+def read_sections(fname, use_mmap=True):
+    '''
+        lit un fichier au format binaire de l'index
+
+        avec use_mmap, le fichier est projeté en mémoire : les tableaux
+        renvoyés sont des vues en lecture seule sur la projection, les pages
+        ne sont lues qu'à l'accès et sont partagées entre les processus
+        qui ouvrent le même fichier
+
+        paramètres
+        ----------
+        fname : string
+                nom du fichier à lire
+        use_mmap : boolean (par défault True)
+                   True pour projeter le fichier en mémoire, False pour
+                   le lire entièrement
+        renvoie
+        -------
+        stats : tuple of int
+                N, V, nombre de postings, somme des longueurs des documents
+        sections : dict of string -> np.array
+                   tableaux contenus dans le fichier (vues sur le contenu
+                   du fichier, sans copie)
+    '''
+    with open(fname, "rb") as f:
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    magic, version, n_sections, *stats = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("{} n'est pas un index binaire".format(fname))
+    if version != VERSION:
+        raise ValueError("version {} du format d'index non supportée".format(version))
+    sections = dict()
+    for k in range(n_sections):
+        name, dtype, offset, count = SECTION.unpack_from(data, HEADER.size + k * SECTION.size)
+        sections[name.rstrip(b"\0").decode("ascii")] = np.frombuffer(data,\
+                dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")), count=count, offset=offset)
+    return tuple(stats), sections
+
+def load_binary(fname, use_mmap=True, analyzer=None):
+    '''
+        charge un index sauvegardé par IndexerSimple.save_binary
+
+        seuls le dictionnaire des termes et la table des documents sont
+        décodés : les tableaux de l'index sont des vues sur le fichier, et
+        les dictionnaires (index, index inversé, df, collection) ne sont
+        reconstruits qu'à la demande
+
+        paramètres
+        ----------
+        fname : string
+                nom du fichier contenant l'index binaire
+        use_mmap : boolean (par défault True)
+                   True pour projeter le fichier en mémoire plutôt que
+                   de le lire entièrement
+        analyzer : object TextRepresenter (par défault None)
+                   traitement des textes des requêtes (celui utilisé à
+                   l'indexation), voir IndexerSimple
+        renvoie
+        -------
+        indexer : object IndexerSimple
+    '''
+    stats, sections = read_sections(fname, use_mmap)
+    N, V = stats[0], stats[1]
+    indexer = IndexerSimple(sections["source"].tobytes().decode("utf-8"), analyzer)
+    indexer.sections = sections
+    indexer.N = N
+    indexer.terms = sections["terms"].tobytes().decode("utf-8").split("\n") if V > 0 else []
+    indexer.term_ids = {token: j for (j, token) in enumerate(indexer.terms)}
+    indexer.doc_ids = sections["doc_ids"]
+    indexer.doc_ord = {i: k for (k, i) in enumerate(indexer.doc_ids.tolist())}
+    indexer.doc_lengths = sections["doc_len"]
+    indexer.doc_words = sections.get("doc_words")
+    if "inv_doc_data" in sections:
+        raise ValueError("{} : ancien format compressé, à sauvegarder de nouveau avec save_binary"\
+                .format(fname))
+    if "inv_data" in sections:
+        indexer.postings = CompressedPostings(sections, "inv_")
+        indexer.doc_terms = CompressedPostings(sections, "fwd_")
+    else:
+        indexer.postings = Postings(sections["inv_ptr"], sections["inv_docs"], sections["inv_tfs"])
+        indexer.doc_terms = Postings(sections["fwd_ptr"], sections["fwd_terms"], sections["fwd_tfs"])
+    indexer.term_df = np.diff(indexer.postings.ptr)
+    return indexer
+
+def flush_run(fname, block):
+    '''
+        écrit un run d'indexation SPIMI : les listes de postings d'un
+        bloc de documents, triées par terme
+
+        paramètres
+        ----------
+        fname : string
+                nom du fichier du run
+        block : dict of string -> (list of int, list of int)
+                numéros d'ordre des documents et nombres d'occurrences de
+                chaque terme du bloc
+    '''
+    terms = sorted(block)
+    ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(block[token][0]) for token in terms])
+    ids = np.fromiter((k for token in terms for k in block[token][0]), dtype=np.int32, count=ptr[-1])
+    tfs = np.fromiter((tf for token in terms for tf in block[token][1]), dtype=np.int32, count=ptr[-1])
+    write_sections(fname, [
+        ("terms", np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8)),
+        ("ptr", ptr),
+        ("ids", ids),
+        ("tfs", tfs),
+    ], (0, len(terms), int(ptr[-1]), 0))
+
+def open_memmap(fname, dtype, size=None):
+    '''
+        projette un fichier en mémoire sous forme de tableau
+
+        paramètres
+        ----------
+        fname : string
+                nom du fichier
+        dtype : numpy dtype
+                type des éléments
+        size : int (par défault None)
+               nombre d'éléments du tableau à créer ; None pour lire le
+               fichier existant
+        renvoie
+        -------
+        array : np.memmap (np.array vide si le tableau est vide, un
+                fichier vide ne pouvant être projeté)
+    '''
+    if size is None:
+        size = os.path.getsize(fname) // np.dtype(dtype).itemsize
+        mode = "r"
+    else:
+        mode = "w+"
+    if size == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(fname, dtype=dtype, mode=mode, shape=(size,))
+
+def index_spimi(documents, source, fname=None, run_postings=1 << 20, tmp_dir=None, analyzer=None):
+    '''
+        indexe une collection en mémoire bornée (single-pass in-memory
+        indexing) et l'écrit au format binaire de save_binary
+
+        les documents sont lus un par un ; leurs postings sont accumulés
+        dans un dictionnaire terme -> liste, écrit trié sur disque (un
+        run) dès qu'il atteint run_postings postings ; les runs sont
+        ensuite fusionnés terme par terme (fusion à k voies) directement
+        dans des tableaux projetés sur disque, l'index (listes de termes
+        des documents) étant rempli par dispersion à mesure ; seuls le
+        dictionnaire des termes et les tableaux par document restent en
+        mémoire
+
+        paramètres
+        ----------
+        documents : iterable of Document
+                    documents de la collection, lus une seule fois
+        source : string
+                 nom du fichier contenant la collection
+        fname : string (par défault None)
+                nom du fichier à écrire, ../index/<source>.bin si None
+        run_postings : int (par défault 1 << 20)
+                       nombre maximal de postings gardés en mémoire avant
+                       l'écriture d'un run
+        tmp_dir : string (par défault None)
+                  répertoire des fichiers temporaires (runs, textes)
+        analyzer : object TextRepresenter (par défault None)
+                   traitement des textes, voir IndexerSimple
+        renvoie
+        -------
+        indexer : object IndexerSimple
+                  index chargé par load_binary depuis fname
+    '''
+    if fname is None:
+        fname = "../index/" + source[:-4] + ".bin"
+    if analyzer is None:
+        analyzer = TextRepresenter.PorterStemmer()
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as dirname:
+        doc_ids = []
+        doc_words = []
+        doc_lengths = []
+        doc_n_terms = []
+        text_ptr = [0]
+        link_ptr = [0]
+        runs = []
+        block = dict()
+        n_postings = 0
+
+        with open(os.path.join(dirname, "text"), "wb") as f_text,\
+                open(os.path.join(dirname, "links"), "wb") as f_links:
+            for doc in documents:
+                k = len(doc_ids)
+                text = doc.get_text()
+                tokens = analyzer.getTextRepresentation(text.lower())
+                for (token, occ) in tokens.items():
+                    postings = block.get(token)
+                    if postings is None:
+                        postings = block[token] = ([], [])
+                    postings[0].append(k)
+                    postings[1].append(occ)
+                doc_ids.append(doc.get_id())
+                doc_words.append(len(WORDS.findall(text)))
+                doc_lengths.append(sum(tokens.values()))
+                doc_n_terms.append(len(tokens))
+                data = text.encode("utf-8")
+                f_text.write(data)
+                text_ptr.append(text_ptr[-1] + len(data))
+                links = np.asarray(doc.get_hyperlinks() or [], dtype=np.int64)
+                f_links.write(links.tobytes())
+                link_ptr.append(link_ptr[-1] + len(links))
+
+                n_postings += len(tokens)
+                if n_postings >= run_postings:
+                    runs.append(os.path.join(dirname, "run{}".format(len(runs))))
+                    flush_run(runs[-1], block)
+                    block = dict()
+                    n_postings = 0
+            if block or not runs:
+                runs.append(os.path.join(dirname, "run{}".format(len(runs))))
+                flush_run(runs[-1], block)
+            del block
+
+        # fusion à k voies des runs : les runs couvrent des documents
+        # consécutifs, les listes d'un terme sont donc concaténées dans
+        # l'ordre des runs
+        run_sections = [read_sections(run)[1] for run in runs]
+        run_terms = [sections["terms"].tobytes().decode("utf-8").split("\n") if len(sections["ptr"]) > 1 \
+                else [] for sections in run_sections]
+        N = len(doc_ids)
+        P = sum(len(sections["ids"]) for sections in run_sections)
+        fwd_ptr = np.zeros(N + 1, dtype=np.int64)
+        fwd_ptr[1:] = np.cumsum(doc_n_terms)
+        cursor = fwd_ptr[:-1].copy()
+        inv_docs = open_memmap(os.path.join(dirname, "inv_docs"), np.int32, P)
+        inv_tfs = open_memmap(os.path.join(dirname, "inv_tfs"), np.int32, P)
+        fwd_terms = open_memmap(os.path.join(dirname, "fwd_terms"), np.int32, P)
+        fwd_tfs = open_memmap(os.path.join(dirname, "fwd_tfs"), np.int32, P)
+
+        terms = []
+        inv_ptr = [0]
+        merged = heapq.merge(*[zip(tokens, itertools.repeat(r), itertools.count()) \
+                for (r, tokens) in enumerate(run_terms)])
+        for (token, r, j) in merged:
+            if not terms or terms[-1] != token:
+                terms.append(token)
+                inv_ptr.append(inv_ptr[-1])
+            sections = run_sections[r]
+            start, end = sections["ptr"][j], sections["ptr"][j+1]
+            ids, tfs = sections["ids"][start:end], sections["tfs"][start:end]
+            position = inv_ptr[-1]
+            inv_docs[position:position + len(ids)] = ids
+            inv_tfs[position:position + len(ids)] = tfs
+            fwd_terms[cursor[ids]] = len(terms) - 1
+            fwd_tfs[cursor[ids]] = tfs
+            cursor[ids] += 1
+            inv_ptr[-1] += len(ids)
+        del run_sections
+
+        texts = open_memmap(os.path.join(dirname, "text"), np.uint8)
+        links = open_memmap(os.path.join(dirname, "links"), np.int64)
+        link_ptr = np.asarray(link_ptr, dtype=np.int64)
+        cited_ids, cited_ptr, cited_by = invert_links(doc_ids, link_ptr, links)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.int64)
+        write_sections(fname, [
+            ("source", np.frombuffer(source.encode("utf-8"), dtype=np.uint8)),
+            ("doc_ids", np.asarray(doc_ids, dtype=np.int64)),
+            ("doc_len", doc_lengths),
+            ("doc_words", np.asarray(doc_words, dtype=np.int64)),
+            ("terms", np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8)),
+            ("inv_ptr", np.asarray(inv_ptr, dtype=np.int64)),
+            ("fwd_ptr", fwd_ptr),
+            ("inv_docs", inv_docs),
+            ("inv_tfs", inv_tfs),
+            ("fwd_terms", fwd_terms),
+            ("fwd_tfs", fwd_tfs),
+            ("text_ptr", np.asarray(text_ptr, dtype=np.int64)),
+            ("text", texts),
+            ("link_ptr", link_ptr),
+            ("links", links),
+            ("cited_ids", cited_ids),
+            ("cited_ptr", cited_ptr),
+            ("cited_by", cited_by),
+        ], (N, len(terms), P, int(doc_lengths.sum())))
+        del inv_docs, inv_tfs, fwd_terms, fwd_tfs, texts, links
+
+    print("Indexation de la collection {} achevée ({} runs)".format(source, len(runs)))
+    return load_binary(fname, analyzer=analyzer)
@@ -2,10 +2,14 @@
 # -*- coding: utf-8 -*-
 import math
 import collections
+import heapq
+import operator
 import porter
 import numpy as np
 import re
+from scipy import sparse
 from weighter import *
+from compression import BLOCK_SIZE, split_blocks
 
 def compute_norm(d):
     '''
@@ -25,6 +29,90 @@ def compute_norm(d):
     vector = np.array(list(d.values()))
     return np.linalg.norm(vector)
 
+def cosine_norm(norms):
+    '''
+        remplace les normes nulles par 1 avant qu'un produit scalaire ne
+        soit divisé par elles : un vecteur dont tous les poids sont nuls
+        a un produit scalaire nul avec tout autre, son score cosinus vaut
+        donc 0 (et non nan)
+
+        paramètres
+        ----------
+        norms : float ou np.array of float
+                normes de documents ou d'une requête
+        renvoie
+        -------
+        norms : float ou np.array of float
+                normes non nulles
+    '''
+    if np.ndim(norms) == 0:
+        return float(norms) if norms > 0 else 1.
+    return np.where(norms > 0, norms, 1.)
+
+def top_k(scores, k=1000):
+    '''
+        sélectionne les k meilleurs scores à l'aide d'un tas, sans trier
+        l'ensemble des scores ; à score égal, l'ordre du dictionnaire
+        est conservé
+
+        paramètres
+        ----------
+        scores : dict of int -> float
+                 score de chaque document
+        k : int (par défault 1000)
+            nombre de documents à conserver
+        renvoie
+        -------
+        ranking : list of (int, float)
+                  liste des k couples identifiant de document - score les
+                  plus élevés, triée par ordre décroissant
+    '''
+    return heapq.nlargest(k, scores.items(), key=operator.itemgetter(1))
+
+def row_max(matrix):
+    '''
+        calcule le maximum de chaque ligne d'une matrice creuse aux
+        valeurs positives (borne supérieure de la contribution de chaque
+        liste de postings)
+
+        paramètres
+        ----------
+        matrix : scipy.sparse.csr_matrix, shape (V, N)
+        renvoie
+        -------
+        maxima : np.array of float, shape (V,)
+                 maximum de chaque ligne (0 pour une ligne vide)
+    '''
+    maxima = np.zeros(matrix.shape[0])
+    nonempty = np.diff(matrix.indptr) > 0
+    if nonempty.any():
+        maxima[nonempty] = np.maximum.reduceat(matrix.data, matrix.indptr[:-1][nonempty])
+    return maxima
+
+def block_max(matrix, block_size=BLOCK_SIZE):
+    '''
+        découpe chaque ligne d'une matrice creuse en blocs de block_size
+        postings et calcule le maximum de chaque bloc
+
+        paramètres
+        ----------
+        matrix : scipy.sparse.csr_matrix, shape (V, N)
+        block_size : int (par défault BLOCK_SIZE)
+                     nombre de postings par bloc
+        renvoie
+        -------
+        blk_ptr : np.array of int64, shape (V + 1,)
+                  premier bloc de chaque ligne
+        blk_last : np.array of int, shape (n_blocks,)
+                   dernier numéro d'ordre de document de chaque bloc
+        blk_max : np.array of float, shape (n_blocks,)
+                  maximum de chaque bloc
+    '''
+    blk_ptr, blk_start, blk_end = split_blocks(matrix.indptr, block_size)
+    if len(blk_start) == 0:
+        return blk_ptr, np.zeros(0, dtype=np.int64), np.zeros(0)
+    return blk_ptr, matrix.indices[blk_end - 1], np.maximum.reduceat(matrix.data, blk_start)
+
 class IRModel:
     '''
         Classe générique d'un modèle de RI
@@ -39,8 +127,302 @@ class IRModel:
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.pruning : string
+                           stratégie de getRanking : None pour l'évaluation
+                           exhaustive, "maxscore", "wand" ou "bmw" (Block-Max
+                           WAND) pour l'élagage dynamique (à définir par les
+                           modèles qui implémentent getRankingPruned)
         '''
         self.indexer = indexer
+        self.pruning = None
+
+    def query_terms(self, query_weights):
+        '''
+            sépare les termes d'une requête présents dans la collection
+
+            paramètres
+            ----------
+            query_weights : dict of string -> int/float
+                            poids des termes de la requête
+            renvoie
+            -------
+            cols : np.array of int
+                   identifiants des termes de la requête présents dans la
+                   collection
+            weights : np.array of float
+                      poids de ces termes dans la requête
+        '''
+        term_ids = self.indexer.term_ids
+        known = [(term_ids[t], w) for (t, w) in query_weights.items() if t in term_ids]
+        cols = np.array([j for (j, w) in known], dtype=np.int64)
+        weights = np.array([w for (j, w) in known], dtype=np.float64)
+        return cols, weights
+
+    def gather_postings(self, term_weights, cols):
+        '''
+            rassemble les postings des termes d'une requête
+
+            paramètres
+            ----------
+            term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                           matrice termes x documents dont les lignes sont
+                           les listes de postings
+            cols : np.array of int
+                   identifiants des termes de la requête
+            renvoie
+            -------
+            docs : np.array of int
+                   numéro d'ordre du document de chaque posting
+            values : np.array
+                     valeur de chaque posting dans term_weights
+            k : np.array of int
+                rang dans cols du terme de chaque posting
+        '''
+        positions, k = self.posting_positions(term_weights, cols)
+        return term_weights.indices[positions], term_weights.data[positions], k
+
+    def posting_positions(self, term_weights, cols):
+        '''
+            paramètres
+            ----------
+            term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                           matrice termes x documents dont les lignes sont
+                           les listes de postings
+            cols : np.array of int
+                   identifiants des termes d'une requête
+            renvoie
+            -------
+            positions : np.array of int
+                        positions dans term_weights.indices et
+                        term_weights.data des postings de ces termes, terme
+                        par terme dans l'ordre de cols
+            k : np.array of int
+                rang dans cols du terme de chaque posting
+        '''
+        ptr = term_weights.indptr
+        starts = ptr[cols]
+        lengths = ptr[cols + 1] - starts
+        k = np.repeat(np.arange(len(cols)), lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)\
+                + np.repeat(starts, lengths)
+        return positions, k
+
+    def accumulate(self, docs, contrib):
+        '''
+            somme les contributions des postings par document
+
+            paramètres
+            ----------
+            docs : np.array of int
+                   numéro d'ordre du document de chaque posting
+            contrib : np.array of float
+                      contribution de chaque posting au score
+            renvoie
+            -------
+            docs : np.array of int
+                   numéros d'ordre des documents touchés, croissants
+            scores : np.array of float
+                     score de chacun de ces documents
+        '''
+        docs, inverse = np.unique(docs, return_inverse=True)
+        return docs, np.bincount(inverse, weights=contrib, minlength=len(docs))
+
+    def scores_to_dict(self, scores, keep, docs=None):
+        '''
+            paramètres
+            ----------
+            scores : np.array of float
+                     score de chaque document, indexé par numéro d'ordre
+                     (ou par position dans docs)
+            keep : np.array of bool
+                   documents à conserver
+            docs : np.array of int (par défault None)
+                   numéros d'ordre des documents dont scores contient le
+                   score, tous les documents si None
+            renvoie
+            -------
+            scores : dict of int -> float
+                     dictionnaire associant à chaque identifiant de
+                     document conservé son score
+        '''
+        kept = np.flatnonzero(keep)
+        ordinals = kept if docs is None else docs[kept]
+        return dict(zip(self.indexer.doc_ids[ordinals].tolist(), scores[kept].tolist()))
+
+    def set_bounds(self, bound_weights):
+        '''
+            calcule les bornes supérieures utilisées par l'élagage
+            dynamique
+
+            paramètres
+            ----------
+            bound_weights : scipy.sparse.csr_matrix, shape (V, N)
+                            matrice termes x documents de la contribution
+                            au score de chaque posting, hors poids du terme
+                            dans la requête, de même structure (mêmes
+                            postings aux mêmes positions) que la matrice
+                            passée à prune
+
+            stocke
+            ------
+            self.bound_weights : le paramètre sus-mentionné
+            self.term_max : np.array of float, shape (V,)
+                            plus grande contribution de chaque liste de
+                            postings
+            self.blk_ptr, self.blk_last, self.blk_max : np.array
+                            découpage des listes en blocs de BLOCK_SIZE
+                            postings (voir block_max) et plus grande
+                            contribution de chaque bloc
+        '''
+        # un nan propagé dans un maximum rendrait les seuils de maxscore,
+        # wand et bmw incomparables : il doit être traité en amont
+        if not np.isfinite(bound_weights.data).all():
+            raise ValueError("contributions non finies : bornes d'élagage incalculables")
+        self.bound_weights = bound_weights
+        self.term_max = row_max(bound_weights)
+        self.blk_ptr, self.blk_last, self.blk_max = block_max(bound_weights)
+
+    def prune(self, cols, weights, term_weights, k, transform=None, doc_norms=None, query_norm=1., keep=None):
+        '''
+            sélectionne les k meilleurs documents selon la stratégie
+            d'élagage self.pruning, évaluée par tableaux (numpy) sur des
+            vues des listes de postings plutôt que document par document
+
+            un seuil (k-ième score courant) est d'abord obtenu en calculant
+            le score exact des k documents de plus forte contribution dans
+            les listes de plus grandes bornes ; les documents qui ne peuvent
+            pas l'atteindre sont écartés selon la stratégie :
+            - "maxscore" : les termes dont la somme des bornes n'atteint
+              pas le seuil ne sont pas évalués ; un document des autres
+              listes est conservé si son score partiel plus cette somme
+              peut atteindre le seuil
+            - "wand" : un document est conservé si la somme des bornes des
+              listes qui le contiennent peut atteindre le seuil
+            - "bmw" (Block-Max WAND) : idem avec les bornes des blocs qui
+              le contiennent ; les blocs dont la borne plus celles des
+              autres termes n'atteint pas le seuil sont ignorés
+
+            les valeurs des postings (et transform) ne sont calculées que
+            pour les documents conservés ; les scores (et l'ordre des
+            ex-aequo, par numéro d'ordre croissant) sont les mêmes que ceux
+            de l'évaluation exhaustive
+
+            paramètres
+            ----------
+            cols : np.array of int
+                   identifiants des termes de la requête
+            weights : np.array of float
+                      poids de ces termes dans la requête ; le score d'un
+                      document est la somme des produits poids * valeur
+            term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                           matrice termes x documents des valeurs des
+                           postings, de même structure que self.bound_weights
+            k : int
+                nombre de documents à renvoyer
+            transform : function (docs, values) -> values (par défault None)
+                        calcul des valeurs à partir de celles de
+                        term_weights, si elles ne sont pas précalculées
+            doc_norms : np.array of float, shape (N,) (par défault None)
+                        si elle est donnée, le score d'un document est
+                        divisé par query_norm * sa norme
+            query_norm : float (par défault 1.)
+                         norme de la requête, diviseur des bornes
+            keep : function np.array of float -> np.array of bool (par défault None)
+                   critère que doit vérifier un score pour être classé
+            renvoie
+            -------
+            ranking : list of (int, float)
+                      liste contenant les identifiants des k documents les
+                      plus pertinents et leur score, triée par ordre décroissant
+        '''
+        if self.pruning not in ("maxscore", "wand", "bmw"):
+            raise ValueError("stratégie d'élagage inconnue : {}".format(self.pruning))
+        if k <= 0 or len(cols) == 0:
+            return []
+        N = self.indexer.N
+        bounds = weights * self.term_max[cols] / query_norm
+        positions, owner = self.posting_positions(term_weights, cols)
+        docs = term_weights.indices[positions]
+
+        def contributions(hit):
+            values = term_weights.data[positions[hit]]
+            if transform is not None:
+                values = transform(docs[hit], values)
+            return weights[owner[hit]] * values
+
+        def ranked(selected):
+            # score exact des documents sélectionnés, sommé dans l'ordre des
+            # termes de la requête comme par accumulate
+            hit = selected[docs]
+            candidates = np.flatnonzero(selected)
+            s = np.bincount(docs[hit], weights=contributions(hit), minlength=N)[candidates]
+            if doc_norms is not None:
+                s = s / (query_norm * doc_norms[candidates])
+            if keep is not None:
+                kept = keep(s)
+                candidates, s = candidates[kept], s[kept]
+            best = np.lexsort((candidates, -s))[:k]
+            return candidates[best], s[best]
+
+        # seuil initial : score exact des k documents de plus forte
+        # contribution dans les listes de plus grandes bornes (autant de
+        # listes qu'il en faut pour couvrir k postings)
+        order = np.argsort(-bounds, kind="stable")
+        lengths = np.cumsum(np.bincount(owner, minlength=len(cols))[order])
+        covering = np.zeros(len(cols), dtype=bool)
+        covering[order[:int(np.searchsorted(lengths, k)) + 1]] = True
+        top = np.flatnonzero(covering[owner])
+        top = top[np.argsort(-weights[owner[top]] * self.bound_weights.data[positions[top]], kind="stable")]
+        first = np.sort(np.unique(docs[top], return_index=True)[1])[:k]
+        selected = np.zeros(N, dtype=bool)
+        selected[docs[top[first]]] = True
+        threshold = -math.inf
+        _, seed_scores = ranked(selected)
+        if len(seed_scores) == k:
+            threshold = seed_scores[-1] - 1e-9 * abs(seed_scores[-1])
+
+        if self.pruning == "bmw":
+            blk_first = self.blk_ptr[cols]
+            n_blocks = self.blk_ptr[cols + 1] - blk_first
+
+        if self.pruning == "maxscore":
+            order = np.argsort(bounds, kind="stable")
+            prefix = np.cumsum(bounds[order])
+            skipped = int(np.count_nonzero(prefix < threshold))
+            essential = np.zeros(len(cols), dtype=bool)
+            essential[order[skipped:]] = True
+            read = essential[owner]
+            contrib = contributions(read)
+            if doc_norms is not None:
+                contrib = contrib / (query_norm * doc_norms[docs[read]])
+            rest = prefix[skipped-1] if skipped > 0 else 0.
+        elif self.pruning == "wand" or n_blocks.max() <= 1:
+            # si aucune liste n'a plus d'un bloc, les bornes des blocs sont
+            # celles des termes : Block-Max WAND se ramène à WAND
+            read = np.ones(len(docs), dtype=bool)
+            contrib = bounds[owner]
+            rest = 0.
+        else:
+            # table (terme, bloc) des bornes des blocs des listes
+            rank = np.arange(n_blocks.max())
+            table = np.where(rank < n_blocks[:, None],\
+                    self.blk_max[np.minimum(blk_first[:, None] + rank, len(self.blk_max) - 1)], 0.)
+            table = table * (weights / query_norm)[:, None]
+            # un bloc n'est lu que si sa borne plus celles des autres
+            # termes peut atteindre le seuil ; un document peut aussi
+            # figurer dans des blocs non lus, de borne au plus dead[i]
+            live = table + (bounds.sum() - bounds)[:, None] >= threshold
+            dead = np.where(live, 0., table).max(axis=1)
+            blocks = (positions - term_weights.indptr[cols][owner]) // BLOCK_SIZE
+            read = live[owner, blocks]
+            contrib = table[owner[read], blocks[read]] - dead[owner[read]]
+            rest = dead.sum()
+
+        selected = np.zeros(N, dtype=bool)
+        selected[docs[read]] = True
+        bound = np.bincount(docs[read], weights=contrib, minlength=N) + rest
+        docs_k, s = ranked(selected & (bound >= threshold))
+        return list(zip(self.indexer.doc_ids[docs_k].tolist(), s.tolist()))
 
     def getScores(self, query):
         '''
@@ -53,23 +435,145 @@ class IRModel:
         '''
         raise NotImplementedError("Please Implement this method")
 
-    def getRanking(self, query):
+    def getRankingPruned(self, query, k):
+        '''
+            retourne les k meilleurs documents par élagage dynamique
+
+            paramètres
+            ----------
+            query : string
+                    requête
+            k : int
+                nombre de documents à renvoyer
+        '''
+        raise NotImplementedError("Please Implement this method")
+
+    def batch_scores(self, queries_terms, term_weights):
+        '''
+            calcule les produits scalaires de plusieurs requêtes avec tous
+            les documents en un seul produit de matrices creuses
+
+            les termes de chaque requête sont gardés dans l'ordre de cols :
+            les contributions sont sommées dans le même ordre que par
+            accumulate, les scores sont donc identiques
+
+            paramètres
+            ----------
+            queries_terms : list of (np.array of int, np.array of float)
+                            identifiants et poids des termes de chaque
+                            requête (voir query_terms)
+            term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                           matrice termes x documents des valeurs des postings
+            renvoie
+            -------
+            scores : scipy.sparse.csr_matrix, shape (n_queries, N)
+                     matrice requêtes x documents des scores
+        '''
+        ptr = np.zeros(len(queries_terms) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum([len(cols) for (cols, weights) in queries_terms])
+        cols = np.concatenate([cols for (cols, weights) in queries_terms] + [[]]).astype(np.int64)
+        weights = np.concatenate([weights for (cols, weights) in queries_terms] + [[]])
+        queries = sparse.csr_matrix((weights, cols, ptr), shape=(len(queries_terms),\
+                term_weights.shape[0]))
+        return (queries @ term_weights).tocsr()
+
+    def getScoresBatch(self, queries):
+        '''
+            retourne les scores des documents pour plusieurs requêtes
+
+            par défaut, getScores est appelée pour chaque requête ; les
+            modèles la redéfinissent par un produit de matrices creuses
+
+            paramètres
+            ----------
+            queries : list of string
+                      requêtes
+            renvoie
+            -------
+            scores : list of (np.array of int, np.array of float)
+                     pour chaque requête, numéros d'ordre des documents
+                     conservés et leurs scores
+        '''
+        batch = []
+        for query in queries:
+            scores = self.getScores(query)
+            docs = np.array([self.indexer.doc_ord[i] for i in scores], dtype=np.int64)
+            batch.append((docs, np.array(list(scores.values()), dtype=np.float64)))
+        return batch
+
+    def getRankingBatch(self, queries, k=1000):
+        '''
+            retourne les classements de plusieurs requêtes
+
+            si self.pruning est None, les scores de toutes les requêtes sont
+            calculés ensemble (getScoresBatch) ; les classements sont les
+            mêmes que ceux de getRanking
+
+            paramètres
+            ----------
+            queries : list of string
+                      requêtes
+            k : int (par défault 1000)
+                nombre de documents à renvoyer par requête
+            renvoie
+            -------
+            rankings : list of (list of (int, float))
+                       classement de chaque requête (voir getRanking)
+        '''
+        if self.pruning is not None:
+            return [self.getRanking(query, k) for query in queries]
+        rankings = []
+        for (docs, scores) in self.getScoresBatch(queries):
+            # score décroissant, puis numéro d'ordre croissant comme top_k
+            best = np.lexsort((docs, -scores))[:max(k, 0)]
+            rankings.append(list(zip(self.indexer.doc_ids[docs[best]].tolist(),\
+                    scores[best].tolist())))
+        return rankings
+
+    def bound_terms(self, query):
+        '''
+            retourne les termes d'une requête et leurs poids tels que le
+            score d'un document soit (à un facteur près) la somme des
+            poids * contributions de ses postings dans self.bound_weights
+
+            paramètres
+            ----------
+            query : string
+                    requête
+        '''
+        raise NotImplementedError("Please Implement this method")
+
+    def getRanking(self, query, k=1000):
         '''
             retourne une liste de couples (document-score) ordonnée
             par score décroissant
 
+            les k meilleurs scores sont sélectionnés parmi tous les scores
+            (getScores) si self.pruning est None, par élagage dynamique
+            (getRankingPruned) sinon ; le classement est le même
+
             paramètres
             ----------
             query : string
                     requête
+            k : int (par défault 1000)
+                nombre de documents à renvoyer
+
+            renvoie
+            -------
+            ranking : list of (int, float)
+                      liste contenant les identifiants des k documents les
+                      plus pertinents et leur score, triée par ordre décroissant
         '''
-        raise NotImplementedError("Please Implement this method")
+        if self.pruning is None:
+            return top_k(self.getScores(query), k)
+        return self.getRankingPruned(query, k)
 
 class Vectoriel(IRModel):
     '''
         Modèle vectoriel
     '''
-    def __init__(self, indexer, weighter, normalized=False):
+    def __init__(self, indexer, weighter, normalized=False, pruning=None):
         '''
             paramètres
             ----------
@@ -78,37 +582,64 @@ class Vectoriel(IRModel):
             normalized : boolean (par défault False)
                          permet de définir la fonction de score (produit
                          scalaire si False et score cosinus si True)
+            pruning : string (par défault None)
+                      stratégie d'élagage dynamique de getRanking : None
+                      pour l'évaluation exhaustive, "maxscore", "wand" ou
+                      "bmw" (Block-Max WAND)
 
             stocke
             ------
             self.indexer : object IndexerSimple
             self.weighter : object Weighter
             self.normalized : boolean
-            self.all_doc_weights : dict of int -> (dict of string -> int/float)
-                                   dictionnaire contenant, pour chaque document
-                                   de la collection, les poids des termes qu'il
-                                   contient (calculés selon self.weighter)
+            self.pruning : string
+            self.doc_weights : scipy.sparse.csr_matrix, shape (N, V)
+                               matrice documents x termes des poids des
+                               termes (calculés selon self.weighter)
+            self.term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                                sa transposée, dont les lignes sont les
+                                listes de postings pondérées
+            self.doc_norms : np.array of float, shape (N,)
+                             norme de chaque document
             self.all_doc_norms : dict of int -> float
                                  dictionnaire contenant, pour chaque document de
                                  la collection, sa norme
+            self.score_norms : np.array of float, shape (N,)
+                               normes au dénominateur du score cosinus, les
+                               normes nulles étant remplacées par 1 (voir
+                               cosine_norm)
+            self.term_max, self.blk_ptr, self.blk_last, self.blk_max :
+                            bornes des listes de postings et de leurs blocs
+                            (voir IRModel.set_bounds), calculées sur les
+                            valeurs divisées par la norme du document si
+                            normalized
         '''
         super().__init__(indexer)
         self.weighter = weighter
         self.normalized = normalized
+        self.pruning = pruning
 
-        self.all_doc_weights = dict()
-        self.all_doc_norms = dict()
+        self.doc_weights, self.doc_norms = weighter.get_doc_weights()
+        self.term_weights = self.doc_weights.T.tocsr()
+        self.all_doc_norms = dict(zip(self.indexer.doc_ids.tolist(), self.doc_norms.tolist()))
 
-        for (idDoc, doc) in self.indexer.getCollection().items():
-            self.all_doc_weights[idDoc] = weighter.getWeightsForDoc(doc)
+        self.score_norms = cosine_norm(self.doc_norms)
 
-        for (doc_id, doc_weights) in self.all_doc_weights.items():
-            self.all_doc_norms[doc_id] = compute_norm(doc_weights)
+        if normalized:
+            # même structure que term_weights (zéros explicites compris)
+            bound_weights = self.term_weights.copy()
+            bound_weights.data = bound_weights.data / self.score_norms[bound_weights.indices]
+            self.set_bounds(bound_weights)
+        else:
+            self.set_bounds(self.term_weights)
 
     def getScores(self, query):
         '''
             retourne les scores des documents pour une requête
 
+            seuls les documents des listes de postings des termes de la
+            requête sont considérés (évaluation terme par terme)
+
             paramètres
             ----------
             query : string
@@ -121,88 +652,155 @@ class Vectoriel(IRModel):
                      dont le score n'est pas nul)
         '''
         query_weights = self.weighter.getWeightsForQuery(query)
-        scores = dict()
+        cols, weights = self.query_terms(query_weights)
+        docs, values, k = self.gather_postings(self.term_weights, cols)
+        docs, rsv = self.accumulate(docs, weights[k] * values)
 
+        if self.normalized:
+            rsv = rsv / (cosine_norm(compute_norm(query_weights)) * self.score_norms[docs])
 
-        if not self.normalized:
-            for (idDoc, weights) in self.all_doc_weights.items():
-                rsv = 0
-                for t in query_weights.keys():
-                    if t in weights:
-                        rsv += query_weights[t]*weights[t]
-                if rsv != 0:
-                    scores[idDoc] = rsv
-        else:
-            query_norm = compute_norm(query_weights)
+        return self.scores_to_dict(rsv, rsv != 0, docs)
 
-            for (idDoc, weights) in self.all_doc_weights.items():
-                inter = 0
-                for t in query_weights.keys():
-                    if t in weights:
-                        inter += query_weights[t]*weights[t]
-                if inter / (query_norm * self.all_doc_norms[idDoc]) != 0:
-                    scores[idDoc] = inter / (query_norm * self.all_doc_norms[idDoc])
+    def getRankingPruned(self, query, k):
+        '''
+            retourne les k meilleurs documents par élagage dynamique
 
-        return scores
+            paramètres
+            ----------
+            query : string
+                    requête
+            k : int
+                nombre de documents à renvoyer
 
-    def getRanking(self, query):
+            renvoie
+            -------
+            ranking : list of (int, float)
+                      liste contenant les identifiants des k documents les
+                      plus pertinents et leur score, triée par ordre décroissant
         '''
-            retourne une liste de couples (document-score) ordonnée
-            par score décroissant
+        query_weights = self.weighter.getWeightsForQuery(query)
+        cols, weights = self.query_terms(query_weights)
+        if self.normalized:
+            query_norm = cosine_norm(compute_norm(query_weights))
+            return self.prune(cols, weights, self.term_weights, k, doc_norms=self.score_norms,\
+                    query_norm=query_norm, keep=lambda s: s != 0)
+        return self.prune(cols, weights, self.term_weights, k, keep=lambda s: s != 0)
 
+    def bound_terms(self, query):
+        '''
             paramètres
             ----------
             query : string
                     requête
+            renvoie
+            -------
+            cols : np.array of int
+                   identifiants des termes de la requête
+            weights : np.array of float
+                      poids de ces termes dans self.bound_weights
+        '''
+        query_weights = self.weighter.getWeightsForQuery(query)
+        cols, weights = self.query_terms(query_weights)
+        if self.normalized:
+            weights = weights / cosine_norm(compute_norm(query_weights))
+        return cols, weights
+
+    def getScoresBatch(self, queries):
+        '''
+            retourne les scores des documents pour plusieurs requêtes,
+            calculés par un seul produit de matrices creuses
 
+            paramètres
+            ----------
+            queries : list of string
+                      requêtes
             renvoie
             -------
-            ranking : list of (int, float)
-                      liste contenant les identifiants des documents les plus
-                      pertinents et leur score, triée par ordre décroissant
+            scores : list of (np.array of int, np.array of float)
+                     pour chaque requête, numéros d'ordre des documents
+                     conservés et leurs scores (les mêmes que getScores)
         '''
-        scores = self.getScores(query)
-        ranking = [(idDoc, scores[idDoc]) for idDoc in sorted(scores, key=scores.get, reverse=True)]
-        return ranking[:1000]
+        queries_weights = [self.weighter.getWeightsForQuery(query) for query in queries]
+        queries_terms = [self.query_terms(query_weights) for query_weights in queries_weights]
+        scores = self.batch_scores(queries_terms, self.term_weights)
+        batch = []
+        for (i, query_weights) in enumerate(queries_weights):
+            docs = scores.indices[scores.indptr[i]:scores.indptr[i+1]]
+            rsv = scores.data[scores.indptr[i]:scores.indptr[i+1]]
+            if self.normalized:
+                rsv = rsv / (cosine_norm(compute_norm(query_weights)) * self.score_norms[docs])
+            batch.append((docs[rsv != 0], rsv[rsv != 0]))
+        return batch
 
 class ModeleLangue(IRModel):
     '''
         Modèle de langue
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, alpha=0.8, pruning=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            alpha : float (par défault 0.8)
+                    poids du modèle du document face au modèle de la
+                    collection
+            pruning : string (par défault None)
+                      stratégie d'élagage dynamique de getRanking : None
+                      pour l'évaluation exhaustive, "maxscore", "wand" ou
+                      "bmw" (Block-Max WAND)
 
             stocke
             ------
             self.indexer : object IndexerSimple
             self.weighter : object Weighter1
-            self.all_doc_weights : dict of int -> (dict of string -> int/float)
-                                   dictionnaire contenant, pour chaque document
-                                   de la collection, les poids des termes qu'il
-                                   contient (calculés selon Weighter1)
+            self.alpha : float
+            self.pruning : string
+            self.doc_weights : scipy.sparse.csr_matrix, shape (N, V)
+                               matrice documents x termes des poids des
+                               termes (calculés selon Weighter1)
+            self.doc_sums : np.array of float, shape (N,)
+                            somme des tfs des termes de chaque document
             self.sum_all_stems : float
                                  somme des tfs de tous les termes de la collection
+            self.term_probs : np.array of float, shape (V,)
+                              probabilité de chaque terme dans la collection
+            self.term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                                matrice termes x documents dont les lignes
+                                sont les listes de postings ; elles contiennent
+                                la contribution - tf * log(tf / somme des tfs du
+                                document) de chaque posting
+            self.term_scores : scipy.sparse.csr_matrix, shape (V, N)
+                               contribution totale de chaque posting au score,
+                               lissage par la collection compris
+            self.term_max, self.blk_ptr, self.blk_last, self.blk_max :
+                            bornes des contributions des listes de postings
+                            et de leurs blocs (voir IRModel.set_bounds)
         '''
         super().__init__(indexer)
         self.weighter = Weighter1(indexer)
+        self.alpha = alpha
+        self.pruning = pruning
 
-        self.all_doc_weights = dict()
-        self.sum_all_stems = 0
+        self.doc_weights = self.weighter.get_doc_weights()[0]
+        self.doc_sums = np.asarray(self.doc_weights.sum(axis=1)).ravel()
+        self.sum_all_stems = self.doc_sums.sum()
+        self.term_probs = np.asarray(self.doc_weights.sum(axis=0)).ravel() / self.sum_all_stems
 
-        for (idDoc, doc) in self.indexer.getCollection().items():
-            self.all_doc_weights[idDoc] = self.weighter.getWeightsForDoc(doc)
+        self.term_weights = self.doc_weights.T.tocsr()
+        tf = self.term_weights.data
+        self.term_weights.data = - tf * np.log(tf / self.doc_sums[self.term_weights.indices])
 
-        for (t,dict_occ) in self.indexer.get_index_inverse().items():
-            occ = list(dict_occ.values())
-            self.sum_all_stems += sum(occ)
+        self.term_scores = self.term_weights.copy()
+        rows = np.repeat(np.arange(self.term_scores.shape[0]), np.diff(self.term_scores.indptr))
+        self.term_scores.data = self.alpha * self.term_scores.data + (1-self.alpha) * self.term_probs[rows]
+        self.set_bounds(self.term_scores)
 
     def getScores(self, query):
         '''
             retourne les scores des documents pour une requête
 
+            seuls les postings des termes de la requête sont parcourus
+
             paramètres
             ----------
             query : string
@@ -215,66 +813,115 @@ class ModeleLangue(IRModel):
                      dont le score n'est pas nul)
         '''
         query_weights = self.weighter.getWeightsForQuery(query)
-        alpha = 0.8
-        scores = dict()
-        index_inverse = self.indexer.get_index_inverse()
-        reg = dict()
-
-        for stem in query_weights.keys():
-            if stem in index_inverse:
-                stem_weights = self.weighter.getWeightsForStem(stem)
-                sum_stem = sum(list(stem_weights.values()))
-                reg[stem] = sum_stem / self.sum_all_stems
-
-        for (idDoc, weights) in self.all_doc_weights.items():
-            s = 0
-            sum_tf_doc = sum(list(weights.values())) # somme de tous les tf des termes du document
-            for t in query_weights.keys():
-                if t in weights:
-                    tf = weights[t]
-                    s += alpha * (- tf * math.log(tf/sum_tf_doc)) + (1-alpha) * reg[t]
-            if s > 0:
-                scores[idDoc] = s
-        return scores
-
-    def getRanking(self, query):
+        cols, weights = self.query_terms(query_weights)
+
+        # contributions des couples (document, terme de la requête) non nuls
+        docs, values, k = self.gather_postings(self.term_weights, cols)
+        contrib = self.alpha * values + (1-self.alpha) * self.term_probs[cols][k]
+        docs, s = self.accumulate(docs, contrib)
+        return self.scores_to_dict(s, s > 0, docs)
+
+    def getRankingPruned(self, query, k):
         '''
-            retourne une liste de couples (document-score) ordonnée
-            par score décroissant
+            retourne les k meilleurs documents par élagage dynamique
 
             paramètres
             ----------
             query : string
                     requête
+            k : int
+                nombre de documents à renvoyer
 
             renvoie
             -------
             ranking : list of (int, float)
-                      liste contenant les identifiants des documents les plus
-                      pertinents et leur score, triée par ordre décroissant
+                      liste contenant les identifiants des k documents les
+                      plus pertinents et leur score, triée par ordre décroissant
         '''
-        scores = self.getScores(query)
-        ranking = [(idDoc, scores[idDoc]) for idDoc in sorted(scores, key=scores.get, reverse=True)]
-        return ranking[:1000]
+        query_weights = self.weighter.getWeightsForQuery(query)
+        cols, weights = self.query_terms(query_weights)
+        return self.prune(cols, np.ones(len(cols)), self.term_scores, k, keep=lambda s: s > 0)
+
+    def bound_terms(self, query):
+        '''
+            paramètres
+            ----------
+            query : string
+                    requête
+            renvoie
+            -------
+            cols : np.array of int
+                   identifiants des termes de la requête
+            weights : np.array of float
+                      poids de ces termes dans self.bound_weights
+        '''
+        cols, weights = self.query_terms(self.weighter.getWeightsForQuery(query))
+        return cols, np.ones(len(cols))
+
+    def getScoresBatch(self, queries):
+        '''
+            retourne les scores des documents pour plusieurs requêtes,
+            calculés par un seul produit de matrices creuses
+
+            paramètres
+            ----------
+            queries : list of string
+                      requêtes
+            renvoie
+            -------
+            scores : list of (np.array of int, np.array of float)
+                     pour chaque requête, numéros d'ordre des documents
+                     conservés et leurs scores (les mêmes que getScores)
+        '''
+        scores = self.batch_scores([self.bound_terms(query) for query in queries],\
+                self.term_scores)
+        batch = []
+        for i in range(len(queries)):
+            docs = scores.indices[scores.indptr[i]:scores.indptr[i+1]]
+            s = scores.data[scores.indptr[i]:scores.indptr[i+1]]
+            batch.append((docs[s > 0], s[s > 0]))
+        return batch
 
 class OkapiBM25(IRModel):
     '''
         Modèle OkapiBM25
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, k1=1.2, b=0.75, impacts=True, pruning=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            k1, b : float (par défault 1.2 et 0.75)
+                    paramètres du modèle
+            impacts : boolean (par défault True)
+                      True pour précalculer la contribution
+                      tf/(tf + norme du document) de chaque posting,
+                      False pour la calculer à chaque requête
+            pruning : string (par défault None)
+                      stratégie d'élagage dynamique de getRanking : None
+                      pour l'évaluation exhaustive, "maxscore", "wand" ou
+                      "bmw" (Block-Max WAND)
 
             stocke
             ------
             self.indexer : object IndexerSimple
             self.weighter : object Weighter3
-            self.all_doc_weights : dict of int -> (dict of string -> int/float)
-                                   dictionnaire contenant, pour chaque document
-                                   de la collection, les poids des termes qu'il
-                                   contient (calculés selon self.weighter)
+            self.k1, self.b : les paramètres sus-mentionnés
+            self.term_weights : scipy.sparse.csr_matrix, shape (V, N)
+                                matrice termes x documents dont les lignes
+                                sont les listes de postings ; elles contiennent
+                                les impacts tf/(tf + norme du document) si
+                                impacts est True, les tfs sinon
+            self.impacts : boolean
+            self.pruning : string
+            self.term_max, self.blk_ptr, self.blk_last, self.blk_max :
+                            bornes des impacts des listes de postings et de
+                            leurs blocs (voir IRModel.set_bounds)
+            self.doc_norm : np.array of float, shape (N,)
+                            dénominateur k1*(1-b) + b*len/avgdl de chaque
+                            document
+            self.doc_len : np.array of int, shape (N,)
+                           longueur (nombre de mots) de chaque document
             self.all_doc_len : dict of int -> int
                                dictionnaire contenant, pour chaque document de
                                la collection, sa longueur
@@ -283,23 +930,36 @@ class OkapiBM25(IRModel):
         '''
         super().__init__(indexer)
         self.weighter = Weighter3(indexer)
+        self.k1 = k1
+        self.b = b
+        self.impacts = impacts
+        self.pruning = pruning
 
-        self.all_doc_weights = dict()
-        self.all_doc_len = dict()
-
-        regex_words = r'\b\w+\b'
-        for (idDoc, doc) in self.indexer.getCollection().items():
-            self.all_doc_weights[idDoc] = self.weighter.getWeightsForDoc(doc)
-            terms = re.findall(regex_words,doc.get_text())
-            self.all_doc_len[idDoc] =  len(terms)
+        self.doc_len = self.indexer.doc_words
+        if self.doc_len is None:
+            regex_words = r'\b\w+\b'
+            collection = self.indexer.getCollection()
+            self.doc_len = np.array([len(re.findall(regex_words, collection[i].get_text()))\
+                    for i in self.indexer.doc_ids.tolist()], dtype=np.int64)
+        self.all_doc_len = dict(zip(self.indexer.doc_ids.tolist(), self.doc_len.tolist()))
 
-        self.avgdl = np.mean(np.array(list(self.all_doc_len.values())))
+        self.avgdl = np.mean(self.doc_len)
+        self.doc_norm = k1 * (1-b) + b*(self.doc_len / self.avgdl)
 
+        self.term_weights = self.weighter.get_doc_weights()[0].T.tocsr()
+        tf = self.term_weights.data
+        term_impacts = self.term_weights.copy()
+        term_impacts.data = tf/(tf + self.doc_norm[self.term_weights.indices])
+        self.set_bounds(term_impacts)
+        if impacts:
+            self.term_weights = term_impacts
 
     def getScores(self, query):
         '''
             retourne les scores des documents pour une requête
 
+            seuls les postings des termes de la requête sont parcourus
+
             paramètres
             ----------
             query : string
@@ -312,39 +972,144 @@ class OkapiBM25(IRModel):
                      dont le score n'est pas nul)
         '''
         query_weights = self.weighter.getWeightsForQuery(query)
-        k1 = 1.2
-        b = 0.75
-        scores = dict()
-
-        for (idDoc, weights) in self.all_doc_weights.items():
-            s = 0
-            for t in query_weights.keys():
-                if t in weights:
-                    idf = query_weights[t]
-                    tf = weights[t]
-                    len_doc = self.all_doc_len[idDoc]
-                    s += idf * (tf/(tf + k1 * (1-b) + b*(len_doc / self.avgdl)))
-            if s > 0:
-                scores[idDoc] = s
-        return scores
-
-    def getRanking(self, query):
+        cols, idf = self.query_terms(query_weights)
+
+        docs, values, k = self.gather_postings(self.term_weights, cols)
+        if not self.impacts:
+            values = values/(values + self.doc_norm[docs])
+        docs, s = self.accumulate(docs, idf[k] * values)
+        return self.scores_to_dict(s, s > 0, docs)
+
+    def getRankingPruned(self, query, k):
         '''
-            retourne une liste de couples (document-score) ordonnée
-            par score décroissant
+            retourne les k meilleurs documents par élagage dynamique
 
             paramètres
             ----------
             query : string
                     requête
+            k : int
+                nombre de documents à renvoyer
 
             renvoie
             -------
             ranking : list of (int, float)
-                      liste contenant les identifiants des documents les plus
-                      pertinents et leur score, triée par ordre décroissant
+                      liste contenant les identifiants des k documents les
+                      plus pertinents et leur score, triée par ordre décroissant
+        '''
+        query_weights = self.weighter.getWeightsForQuery(query)
+        cols, idf = self.query_terms(query_weights)
+        transform = None
+        if not self.impacts:
+            transform = lambda docs, values: values/(values + self.doc_norm[docs])
+        return self.prune(cols, idf, self.term_weights, k, transform, keep=lambda s: s > 0)
+
+    def bound_terms(self, query):
+        '''
+            paramètres
+            ----------
+            query : string
+                    requête
+            renvoie
+            -------
+            cols : np.array of int
+                   identifiants des termes de la requête
+            weights : np.array of float
+                      poids de ces termes dans self.bound_weights
+        '''
+        return self.query_terms(self.weighter.getWeightsForQuery(query))
+
+    def getScoresBatch(self, queries):
         '''
-        scores = self.getScores(query)
-        ranking = [(idDoc, scores[idDoc]) for idDoc in sorted(scores, key=scores.get, reverse=True)]
-        return ranking[:1000]
+            retourne les scores des documents pour plusieurs requêtes,
+            calculés par un seul produit de matrices creuses
+
+            paramètres
+            ----------
+            queries : list of string
+                      requêtes
+            renvoie
+            -------
+            scores : list of (np.array of int, np.array of float)
+                     pour chaque requête, numéros d'ordre des documents
+                     conservés et leurs scores (les mêmes que getScores)
+        '''
+        scores = self.batch_scores([self.bound_terms(query) for query in queries],\
+                self.bound_weights)
+        batch = []
+        for i in range(len(queries)):
+            docs = scores.indices[scores.indptr[i]:scores.indptr[i+1]]
+            s = scores.data[scores.indptr[i]:scores.indptr[i+1]]
+            batch.append((docs[s > 0], s[s > 0]))
+        return batch
+
+class ScoreAtATime(IRModel):
+    '''
+        Évaluation score par score (score-at-a-time) d'un modèle sur un
+        index ordonné par impact : les segments de postings des termes de
+        la requête sont parcourus par contribution décroissante, et
+        l'évaluation s'arrête après budget postings ; les scores, calculés
+        à partir des impacts quantifiés, approchent (à un facteur près)
+        ceux du modèle
+    '''
+    def __init__(self, model, bits=8, budget=None):
+        '''
+            paramètres
+            ----------
+            model : object Vectoriel, ModeleLangue ou OkapiBM25
+                    modèle dont les contributions (model.bound_weights)
+                    sont quantifiées
+            bits : int (par défault 8)
+                   nombre de bits des impacts quantifiés
+            budget : int (par défault None)
+                     nombre maximal de postings parcourus par requête
+                     (None pour parcourir toutes les listes)
+
+            stocke
+            ------
+            self.indexer : object IndexerSimple
+            self.model : le modèle sus-mentionné
+            self.budget : le budget sus-mentionné
+            self.impacts : object ImpactPostings
+                           index ordonné par impact
+        '''
+        super().__init__(model.indexer)
+        self.model = model
+        self.budget = budget
+        self.impacts = self.indexer.getImpactPostings(model.bound_weights, bits)
+
+    def getScores(self, query):
+        '''
+            retourne les scores approchés des documents pour une requête
+
+            paramètres
+            ----------
+            query : string
+                    requête
+            renvoie
+            -------
+            scores : dict of int -> float
+                     dictionnaire associant à chaque document atteint
+                     avant épuisement du budget son score approché
+        '''
+        cols, weights = self.model.bound_terms(query)
+        impacts = self.impacts
+
+        # segments des termes de la requête, par contribution décroissante
+        first, last = impacts.seg_ptr[cols], impacts.seg_ptr[cols + 1]
+        k = np.repeat(np.arange(len(cols)), last - first)
+        segments = np.arange(len(k)) - np.repeat(np.cumsum(last - first) - (last - first),\
+                last - first) + np.repeat(first, last - first)
+        contrib = weights[k] * impacts.seg_impact[segments] * impacts.scale
+        order = np.argsort(-contrib, kind="stable")
+        segments, contrib = segments[order], contrib[order]
 
+        starts = impacts.seg_start[segments]
+        lengths = impacts.seg_start[segments + 1] - starts
+        if self.budget is not None:
+            ends = np.minimum(np.cumsum(lengths), self.budget)
+            lengths = np.maximum(ends - (np.cumsum(lengths) - lengths), 0)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)\
+                + np.repeat(starts, lengths)
+        docs, s = self.accumulate(impacts.docs[positions], np.repeat(contrib, lengths))
+        return self.scores_to_dict(s, s > 0, docs)
@@ -1,9 +1,39 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import operator
 import numpy as np
-import copy
-import math
+from scipy import sparse
+from models import top_k
+
+def transition_matrix(G, nodes):
+    '''
+        construit la matrice de transition creuse d'un sous-graphe
+
+        paramètres
+        ----------
+        G : dict of int -> (dict of int -> float)
+            sous-graphe de documents (voir PageRank.extract_graph)
+        nodes : list of int
+                noeuds du graphe (noeuds de G et documents qu'ils citent),
+                sans doublon
+        renvoie
+        -------
+        P : scipy.sparse.csr_matrix, shape (len(nodes), len(nodes))
+            P[j, i] est le poids G[nodes[i]][nodes[j]] du lien de nodes[i]
+            vers nodes[j]
+        in_graph : np.array of bool
+                   True pour les noeuds de G
+    '''
+    index = {node: j for (j, node) in enumerate(nodes)}
+    rows, cols, data = [], [], []
+    for (node, targets) in G.items():
+        for (target, weight) in targets.items():
+            rows.append(index[target])
+            cols.append(index[node])
+            data.append(weight)
+    P = sparse.csr_matrix((np.array(data, dtype=np.float64), (rows, cols)), shape=(len(nodes), len(nodes)))
+    in_graph = np.zeros(len(nodes), dtype=bool)
+    in_graph[[index[node] for node in G]] = True
+    return P, in_graph
 
 class PageRank:
     '''
@@ -35,6 +65,8 @@ class PageRank:
             ----------
             parser : Parser object
                      permet de récupérer les hyperliens des documents
+                     (getHyperlinksTo, getHyperlinksFrom : un IndexerSimple
+                     ou un CitationIndex conviennent aussi)
             seeds : list of int
                     liste des identifiants des documents seeds
             renvoie
@@ -50,11 +82,11 @@ class PageRank:
 
         for node in S:
             G[node] = parser.getHyperlinksFrom(node)
-            if self.k <= len(parser.getHyperlinksTo(node)):
-                k_random = np.random.choice(parser.getHyperlinksTo(node),\
-                        self.k, replace=False)
+            citing = parser.getHyperlinksTo(node)
+            if self.k <= len(citing):
+                k_random = np.random.choice(citing, self.k, replace=False)
             else:
-                k_random = parser.getHyperlinksTo(node)
+                k_random = citing
             # ajout de k documents choisis aléatoirement parmi ceux pointant vers node
             for other_node in k_random:
                 if other_node not in G:
@@ -65,41 +97,61 @@ class PageRank:
                     G[other_node] = parser.getHyperlinksFrom(other_node)
         return G
 
-    def compute_PR_score(self, pr, G, d, a):
+    def compute_PR_score(self, pr, G, d=0.85, a=1, tol=1e-4, max_iter=100, dangling=False):
         '''
-            calcule les scores Page Rank des documents d'un sous-graphe
+            calcule les scores Page Rank des documents d'un sous-graphe par
+            la méthode de la puissance sur sa matrice de transition creuse
+
+            par défault, seuls les noeuds de G sont mis à jour à chaque
+            itération (d * scores reçus + (1-d) * a) puis les scores sont
+            normalisés par leur somme sur G ; avec dangling, tous les noeuds
+            sont mis à jour et le score des noeuds sans lien sortant est
+            redistribué uniformément (Page Rank classique)
 
             paramètres
             ----------
             pr : dict of int -> float
-                 score Page Rank des documents à l'itération précédente
+                 score Page Rank initial de chaque noeud du graphe
             G : dict of int -> (dict of int -> float)
                 sous-graphe de documents
-            d, a : float
+            d, a : float (par défault 0.85 et 1)
                    paramètres de pondération du Page Rank
+            tol : float (par défault 1e-4)
+                  seuil de convergence sur la norme L1 de la variation
+                  des scores
+            max_iter : int (par défault 100)
+                       nombre maximal d'itérations
+            dangling : boolean (par défault False)
+                       True pour redistribuer le score des noeuds sans
+                       lien sortant
             renvoie
             -------
             new_pr : dict of int -> float
-                     dictionnaire des score Page Rank des documents mis
-                     à jour
+                     dictionnaire des score Page Rank des documents
         '''
-        new_pr = copy.deepcopy(pr)
-        total_pr=0
-        for idDoc in G.keys():
-            s = 0
-            #for from_node in G[idDoc]:
-            for from_node in G.keys():
-                if idDoc in G[from_node].keys():
-                    s += pr[from_node] * G[from_node][idDoc]
-            new_pr[idDoc] = d * s + (1-d) * a
-            total_pr += new_pr[idDoc]
-
-        # normalisation
-        for idDoc in new_pr.keys():
-            new_pr[idDoc]=new_pr[idDoc]/total_pr
-        return new_pr
-
-    def compute_pageRank(self, q, parser):
+        if not pr:
+            return dict()
+        nodes = list(pr.keys())
+        P, in_graph = transition_matrix(G, nodes)
+        x = np.array(list(pr.values()), dtype=np.float64)
+        sinks = np.asarray(P.sum(axis=0)).ravel() == 0
+        n = len(nodes)
+
+        for _ in range(max_iter):
+            if dangling:
+                new = d * (P @ x + x[sinks].sum() / n) + (1-d) / n
+            else:
+                new = x.copy()
+                new[in_graph] = d * (P @ x)[in_graph] + (1-d) * a
+                new /= new[in_graph].sum()
+            loss = np.abs(new - x).sum()
+            x = new
+            if loss < tol:
+                break
+
+        return dict(zip(nodes, x.tolist()))
+
+    def compute_pageRank(self, q, parser, k=1000, d=0.85, tol=1e-4, max_iter=100, dangling=False):
         '''
             à partir d'une requête, applique l'algorithme de Page Rank
             sur un sous-graphe de documents et ordonne les documents
@@ -111,14 +163,17 @@ class PageRank:
                 requête
             parser : Parser object
                      permet de récupérer les hyperliens des documents
+            k : int (par défault 1000)
+                nombre de documents à renvoyer
+            d, tol, max_iter, dangling :
+                paramètres de compute_PR_score
             renvoie
             -------
             sorted_pageranks : list of (int, float)
-                               liste de tuples identifiant de document -
+                               liste des k tuples identifiant de document -
                                score Page Rank triée dans l'ordre décroissant
         '''
-        ranking = np.array(self.model.getRanking(q))
-        seeds = ranking[:self.n,0]
+        seeds = [idDoc for (idDoc, score) in self.model.getRanking(q, self.n)]
         G = self.extract_graph(parser, seeds)
         nodes = list(G.keys())
 
@@ -126,22 +181,6 @@ class PageRank:
             nodes.extend(list(dict_target.keys()))
 
         page_ranks = {node:1./len(nodes) for node in nodes}
-        d = 0.85
-        a = 1
-
-        current = copy.deepcopy(page_ranks)
-        loss = np.inf
-
-        while loss > 10**-4:
-            new = self.compute_PR_score(current,G,d,a)
-            loss = 0
-            for node in new.keys():
-                loss += math.pow((new[node] - current[node]),2)
-            current = copy.deepcopy(new)
-
-        sorted_pageranks = sorted(current.items(), \
-            key=operator.itemgetter(1), reverse=True)
-        return sorted_pageranks[:1000]
-
-
+        current = self.compute_PR_score(page_ranks, G, d, 1, tol, max_iter, dangling)
 
+        return top_k(current, k)
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
+import mmap
+import numpy as np
 from collections import Counter
+from collections.abc import Mapping
 
 class Document:
     '''
@@ -54,6 +58,277 @@ class Document:
         '''
         return self.hyper
 
+def parse_lines(lines):
+    '''
+        parse des lignes au format de la collection (.I, .T, .X) : chaque
+        Document est produit dès que sa dernière ligne a été lue ; le
+        texte d'un document est accumulé dans une liste de lignes
+
+        paramètres
+        ----------
+        lines : iterable of string
+                lignes du fichier
+        renvoie
+        -------
+        générateur de Document, dans l'ordre des lignes
+    '''
+    i = None
+    for line in lines:
+        if line.startswith('.I'):
+            if i is not None:
+                yield Document(i, "".join(t).replace('\n', ' '), hyper)
+            i = int(line.split()[1])
+            t = []
+            hyper = []
+            field = '.I'
+        elif i is None:
+            continue
+        elif field == '.I':
+            # le titre n'est lu que s'il suit directement .I
+            field = line[:2] if line.startswith('.') else None
+        elif line.startswith('.'):
+            field = None if line.startswith('.T') else line[:2]
+        elif field == '.T':
+            t.append(line)
+        elif field == '.X':
+            aux = (line.replace('\n', '')).split("\t")
+            if len(aux) > 1:
+                hyper.append(int(aux[0]))
+    if i is not None:
+        yield Document(i, "".join(t).replace('\n', ' '), hyper)
+
+class DocumentStore(Mapping):
+    '''
+        collection dont les documents ne sont décodés qu'à l'accès : seuls
+        les identifiants des documents et les positions de leurs données
+        restent en mémoire ; s'utilise comme le dictionnaire int -> Document
+        construit par Parser.buildDocCollection
+
+        les sous-classes définissent load(k), qui construit le document de
+        numéro d'ordre k
+    '''
+    def __init__(self, doc_ids, doc_ord=None):
+        '''
+            paramètres
+            ----------
+            doc_ids : np.array of int64
+                      identifiants des documents, dans l'ordre de la
+                      collection
+            doc_ord : dict of int -> int (par défault None)
+                      numéro d'ordre de chaque identifiant, déduit de
+                      doc_ids si None
+
+            stocke
+            ------
+            self.doc_ids, self.doc_ord : les paramètres sus-mentionnés
+        '''
+        self.doc_ids = doc_ids
+        self.doc_ord = doc_ord if doc_ord is not None else \
+                {i: k for (k, i) in enumerate(doc_ids.tolist())}
+
+    def load(self, k):
+        '''
+            paramètres
+            ----------
+            k : int
+                numéro d'ordre d'un document
+            renvoie
+            -------
+            doc : object Document
+        '''
+        raise NotImplementedError
+
+    def __getitem__(self, i):
+        return self.load(self.doc_ord[i])
+
+    def __contains__(self, i):
+        return i in self.doc_ord
+
+    def __iter__(self):
+        return iter(self.doc_ord)
+
+    def __len__(self):
+        return len(self.doc_ord)
+
+class SourceDocumentStore(DocumentStore):
+    '''
+        documents lus dans le fichier de la collection, projeté en mémoire :
+        chaque document est reparsé depuis la position de sa ligne .I
+    '''
+    def __init__(self, name, doc_ids, offsets):
+        '''
+            paramètres
+            ----------
+            name : string
+                   nom du fichier contenant la collection
+            doc_ids : np.array of int64
+                      identifiants des documents, dans l'ordre du fichier
+            offsets : np.array of int64, shape (len(doc_ids) + 1,)
+                      positions (en octets) de début de chaque document
+                      et taille du fichier
+
+            stocke
+            ------
+            self.name, self.offsets : les paramètres sus-mentionnés
+            self.data : mmap.mmap
+                        projection du fichier (ouverte au premier accès)
+        '''
+        super().__init__(doc_ids)
+        self.name = name
+        self.offsets = offsets
+        self.data = None
+
+    def load(self, k):
+        if self.data is None:
+            with open(self.name, "rb") as fp:
+                self.data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        record = self.data[self.offsets[k]:self.offsets[k+1]]
+        return next(parse_lines(io.TextIOWrapper(io.BytesIO(record))))
+
+    def __getstate__(self):
+        # la projection n'est pas sérialisable, elle est rouverte à l'accès
+        state = self.__dict__.copy()
+        state["data"] = None
+        return state
+
+class CitationIndex:
+    '''
+        index des hyperliens de la collection sous forme de tableaux
+        contigus : liens sortants de chaque document (dans l'ordre du
+        fichier) et, pour chaque document cité, documents qui le citent
+    '''
+    def __init__(self, doc_ids, link_ptr, links, cited=None, doc_ord=None):
+        '''
+            paramètres
+            ----------
+            doc_ids : np.array of int64
+                      identifiants des documents, dans l'ordre de la
+                      collection
+            link_ptr : np.array of int64, shape (len(doc_ids) + 1,)
+                       positions de début et de fin des liens de chaque
+                       document dans links
+            links : np.array of int64
+                    identifiants des documents cités
+            cited : tuple of np.array (par défault None)
+                    (cited_ids, cited_ptr, cited_by) tels que renvoyés par
+                    invert_links, calculés si None
+            doc_ord : dict of int -> int (par défault None)
+                      numéro d'ordre de chaque identifiant, déduit de
+                      doc_ids si None
+
+            stocke
+            ------
+            self.doc_ids, self.link_ptr, self.links, self.doc_ord :
+                      les paramètres sus-mentionnés
+            self.cited_ids : np.array of int64
+                             identifiants cités, triés
+            self.cited_ptr : np.array of int64, shape (len(cited_ids) + 1,)
+                             positions de début et de fin des documents
+                             citant chaque identifiant dans cited_by
+            self.cited_by : np.array of int64
+                            identifiants des documents citants, dans
+                            l'ordre de la collection, sans doublon
+            self.cited_ord : dict of int -> int
+                             rang de chaque identifiant dans cited_ids
+        '''
+        self.doc_ids = doc_ids
+        self.link_ptr = link_ptr
+        self.links = links
+        self.doc_ord = doc_ord if doc_ord is not None else \
+                {i: k for (k, i) in enumerate(doc_ids.tolist())}
+        if cited is None:
+            cited = invert_links(doc_ids, link_ptr, links)
+        self.cited_ids, self.cited_ptr, self.cited_by = cited
+        self.cited_ord = {i: j for (j, i) in enumerate(self.cited_ids.tolist())}
+
+    def getHyperlinksTo(self, id_doc):
+        '''
+            renvoie les documents citant un document
+
+            paramètres
+            ----------
+            id_doc : int
+                     identifiant d'un document
+            renvoie
+            -------
+            hyperlinks : int list
+                         documents citant le document d'identifiant id_doc
+        '''
+        j = self.cited_ord.get(id_doc)
+        if j is None:
+            return []
+        return self.cited_by[self.cited_ptr[j]:self.cited_ptr[j+1]].tolist()
+
+    def getHyperlinksFrom(self, id_doc):
+        '''
+            renvoie les documents cités par un document
+
+            paramètres
+            ----------
+            id_doc : int
+                     identifiant d'un document
+            renvoie
+            -------
+            hyperlinks : dict int -> float
+                         dictionnaire dont chaque clé est l'identifiant d'un
+                         document cité par celui d'identifiant id_doc, et la
+                         valeur correspondante est la fréquence d'apparition
+                         de l'hyperlien parmi tous les hyperliens du document
+                         (vide pour un document cité absent de la collection)
+        '''
+        k = self.doc_ord.get(id_doc)
+        if k is None:
+            return dict()
+        hyperlinks = dict(Counter(self.links[self.link_ptr[k]:self.link_ptr[k+1]].tolist()))
+        total = sum(hyperlinks.values())
+        for doc in hyperlinks.keys():
+            hyperlinks[doc] = hyperlinks[doc] * 1./ total
+        return hyperlinks
+
+def invert_links(doc_ids, link_ptr, links):
+    '''
+        construit l'index des liens entrants à partir des liens sortants
+
+        paramètres
+        ----------
+        doc_ids, link_ptr, links : np.array
+                 liens sortants, voir CitationIndex
+        renvoie
+        -------
+        cited_ids, cited_ptr, cited_by : np.array of int64
+                 liens entrants, voir CitationIndex
+    '''
+    links = np.asarray(links, dtype=np.int64)
+    owner = np.repeat(np.arange(len(doc_ids)), np.diff(link_ptr))
+    # tri par document cité puis par document citant, sans doublon
+    order = np.lexsort((owner, links))
+    targets, owner = links[order], owner[order]
+    keep = np.ones(len(targets), dtype=bool)
+    keep[1:] = (targets[1:] != targets[:-1]) | (owner[1:] != owner[:-1])
+    targets, owner = targets[keep], owner[keep]
+    cited_ids, starts = np.unique(targets, return_index=True)
+    cited_ptr = np.append(starts, len(targets)).astype(np.int64)
+    return cited_ids, cited_ptr, np.asarray(doc_ids, dtype=np.int64)[owner]
+
+def build_citations(doc_ids, hyperlinks):
+    '''
+        construit l'index des hyperliens d'une collection
+
+        paramètres
+        ----------
+        doc_ids : list of int
+                  identifiants des documents
+        hyperlinks : list of (int list)
+                     hyperliens de chaque document (None pour aucun)
+        renvoie
+        -------
+        citations : object CitationIndex
+    '''
+    link_ptr = np.zeros(len(doc_ids) + 1, dtype=np.int64)
+    link_ptr[1:] = np.cumsum([len(hyper or []) for hyper in hyperlinks])
+    links = np.fromiter((j for hyper in hyperlinks for j in hyper or []), dtype=np.int64, count=link_ptr[-1])
+    return CitationIndex(np.array(doc_ids, dtype=np.int64), link_ptr, links)
+
 class Parser:
     '''
         permet de parser la collection
@@ -63,16 +338,35 @@ class Parser:
         '''
             stocke
             ------
-            self.collection : dict int -> Document
+            self.collection : dict int -> Document (ou DocumentStore)
                               dictionnaire associant à chaque identifiant de
                               document l'objet Document correspondant
             self.source : string
                           nom du fichier contenant la collection
+            self.citations : object CitationIndex
+                             hyperliens sortants et entrants des documents
         '''
         self.collection = None
         self.source = None
+        self.citations = None
+
+    def iterDocuments(self, name):
+        '''
+            parse le fichier en flux (voir parse_lines), sans construire la
+            collection
+
+            paramètres
+            ----------
+            name : string
+                   nom du fichier contenant la collection
+            renvoie
+            -------
+            générateur de Document, dans l'ordre du fichier
+        '''
+        with open(name) as fp:
+            yield from parse_lines(fp)
 
-    def buildDocCollection(self, name):
+    def buildDocCollection(self, name, lazy=False):
         '''
             parse le fichier et stocke la collection sous la forme d'un
             dictionnaire de Document
@@ -81,43 +375,49 @@ class Parser:
             ----------
             name : string
                    nom du fichier contenant la collection
+            lazy : boolean (par défault False)
+                   True pour ne relever que l'identifiant et la position
+                   de chaque document : la collection est alors un
+                   SourceDocumentStore, qui ne lit les documents qu'à
+                   l'accès
         '''
         self.source = name
-        self.collection = dict()
         count = 0 # nombre de documents
 
-        with open(name) as fp:
-            line = fp.readline()
-            while line:
-                if line.startswith('.I'):
-                    hyper=[]
-                    count += 1
-                    i=int(line.split()[1])
-                    t=""
-                    line = fp.readline()
-                    if (line.startswith(".T")):
-                        line = fp.readline()
-                        while (not(line.startswith("."))):
-                            t+=line
-                            line = fp.readline()
-                    t=t.replace('\n',' ')
-                    while(not(line.startswith(".I"))and line ):
-                        if line.startswith('.X'):
-                            line = fp.readline()
-                            while (not(line.startswith(".")) ) and line:
-                                aux=(line.replace('\n','')).split("	")
-                                if (len(aux)>1):
-                                    hyper.append(int(aux[0]))
-                                line = fp.readline()
-                        else:
-                            line = fp.readline()
-                    if len(t) > 0:
-                        d = Document(i, t,hyper)
-                    else:
-                        d = Document(i, "",hyper)
-                    self.collection[i] = d
-                if not (line.startswith('.I')):
-                    line = fp.readline()
+        if lazy:
+            doc_ids = []
+            offsets = []
+            hyperlinks = []
+            position = 0
+            field = None
+            with open(name, "rb") as fp:
+                for line in fp:
+                    if line.startswith(b'.I'):
+                        doc_ids.append(int(line.split()[1]))
+                        offsets.append(position)
+                        hyperlinks.append([])
+                        field = b'.I'
+                    elif line.startswith(b'.'):
+                        field = line[:2]
+                    elif field == b'.X' and hyperlinks:
+                        aux = line.rstrip(b'\r\n').split(b"\t")
+                        if len(aux) > 1:
+                            hyperlinks[-1].append(int(aux[0]))
+                    position += len(line)
+            offsets.append(position)
+            count = len(doc_ids)
+            self.collection = SourceDocumentStore(name, np.array(doc_ids, dtype=np.int64),\
+                    np.array(offsets, dtype=np.int64))
+            # un identifiant répété désigne son dernier document
+            doc_ord = self.collection.doc_ord
+            self.citations = build_citations(list(doc_ord), [hyperlinks[k] for k in doc_ord.values()])
+        else:
+            self.collection = dict()
+            for d in self.iterDocuments(name):
+                count += 1
+                self.collection[d.get_id()] = d
+            self.citations = build_citations(list(self.collection),\
+                    [d.get_hyperlinks() for d in self.collection.values()])
 
         print("Construction achevée : la collection {} contient {} documents.".\
                 format(self.source, count))
@@ -126,7 +426,7 @@ class Parser:
         '''
             renvoie
             -------
-            self.collection : dict int -> Document
+            self.collection : dict int -> Document (ou DocumentStore)
                               la collection parsée
         '''
         return self.collection
@@ -153,7 +453,7 @@ class Parser:
 
     def getHyperlinksTo(self,id_doc):
         '''
-            renvoie les documents citant un document
+            renvoie les documents citant un document (voir CitationIndex)
 
             paramètres
             ----------
@@ -164,16 +464,11 @@ class Parser:
             hyperlinks : int list
                          documents citant le document d'identifiant id_doc
         '''
-        hyperlinks=[]
-        for (i,doc) in self.collection.items():
-            hyper = doc.get_hyperlinks()
-            if (hyper is not None) and (id_doc in hyper):
-                hyperlinks.append(i)
-        return hyperlinks
+        return self.citations.getHyperlinksTo(id_doc)
 
     def getHyperlinksFrom(self,id_doc):
         '''
-            renvoie les documents cités par un document
+            renvoie les documents cités par un document (voir CitationIndex)
 
             paramètres
             ----------
@@ -187,11 +482,4 @@ class Parser:
                          valeur correspondante est la fréquence d'apparition
                          de l'hyperlien parmi tous les hyperliens du document
         '''
-        hyperlinks = self.collection[id_doc].get_hyperlinks()
-        if hyperlinks is None:
-            return []
-        hyperlinks = dict(Counter(hyperlinks))
-        total = sum(hyperlinks.values())
-        for doc in hyperlinks.keys():
-            hyperlinks[doc] = hyperlinks[doc] * 1./ total
-        return hyperlinks
+        return self.citations.getHyperlinksFrom(id_doc)
@@ -3,26 +3,40 @@
 from indexation import *
 import collections
 import numpy as np
+from scipy import sparse
 import math
-import copy
-import porter
+import os
+import tempfile
 
 class Weighter:
     '''
         Classe générique de pondération
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier où conserver la matrice des poids des
+                        documents entre deux exécutions (pas de cache
+                        sur disque si None)
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
+            self.doc_weights : scipy.sparse.csr_matrix, shape (N, V)
+                               matrice documents x termes des poids
+                               (construite au premier appel de get_doc_weights)
+            self.doc_norms : np.array of float, shape (N,)
+                             norme de chaque document (idem)
         '''
         self.indexer = indexer
+        self.cache_dir = cache_dir
+        self.doc_weights = None
+        self.doc_norms = None
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -36,6 +50,98 @@ class Weighter:
         '''
         raise NotImplementedError("Please Implement this method")
 
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les poids des termes de tous les documents sous forme
+            de matrice creuse, construite à partir de getWeightsForDoc
+
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des poids, indexée comme
+                      self.indexer.get_matrix()
+        '''
+        indexer = self.indexer
+        collection = indexer.getCollection()
+        term_ids = indexer.term_ids
+        rows, cols, data = [], [], []
+        for (k, i) in enumerate(indexer.doc_ids.tolist()):
+            for (t, w) in self.getWeightsForDoc(collection[i]).items():
+                rows.append(k)
+                cols.append(term_ids[t])
+                data.append(w)
+        return sparse.csr_matrix((np.array(data, dtype=np.float64), (rows, cols)),\
+                shape=(indexer.N, len(indexer.terms)))
+
+    def cache_file(self):
+        '''
+            renvoie
+            -------
+            fname : string
+                    nom du fichier du cache des poids des documents, qui
+                    dépend de la collection, de la version de l'index et
+                    de la classe de pondération
+        '''
+        source = os.path.splitext(os.path.basename(self.indexer.source))[0]
+        return os.path.join(self.cache_dir, "{}_{}_{}.bin".format(source,\
+                type(self).__name__, self.indexer.get_version()))
+
+    def get_doc_weights(self):
+        '''
+            retourne la matrice des poids des documents et leurs normes,
+            calculées une seule fois (getDocWeightsMatrix) puis conservées
+            en mémoire et, si self.cache_dir est défini, sur disque au
+            format binaire de l'index
+
+            renvoie
+            -------
+            self.doc_weights : scipy.sparse.csr_matrix, shape (N, V)
+                               matrice documents x termes des poids
+            self.doc_norms : np.array of float, shape (N,)
+                             norme de chaque document
+        '''
+        if self.doc_weights is not None:
+            return self.doc_weights, self.doc_norms
+        fname = self.cache_file() if self.cache_dir is not None else None
+
+        if fname is not None and os.path.exists(fname):
+            stats, sections = read_sections(fname, use_mmap=False)
+            self.doc_weights = sparse.csr_matrix((sections["data"], sections["indices"],\
+                    sections["indptr"]), shape=(stats[0], stats[1]))
+            self.doc_norms = sections["norms"]
+            return self.doc_weights, self.doc_norms
+
+        self.doc_weights = self.getDocWeightsMatrix()
+        self.doc_norms = np.sqrt(np.asarray(self.doc_weights.multiply(self.doc_weights)\
+                .sum(axis=1)).ravel())
+        if fname is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # écriture dans un fichier temporaire du même dossier, renommé
+            # une fois complet : une écriture interrompue ou concurrente ne
+            # laisse jamais un cache tronqué sous le nom définitif
+            fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            os.close(fd)
+            try:
+                write_sections(tmp_name, [("indptr", self.doc_weights.indptr.astype(np.int64)),\
+                        ("indices", self.doc_weights.indices.astype(np.int32)),\
+                        ("data", self.doc_weights.data.astype(np.float64)),\
+                        ("norms", self.doc_norms)],\
+                        (self.indexer.N, len(self.indexer.terms), self.doc_weights.nnz, 0))
+                os.replace(tmp_name, fname)
+            except BaseException:
+                os.remove(tmp_name)
+                raise
+        return self.doc_weights, self.doc_norms
+
+    def getDocNorms(self):
+        '''
+            renvoie
+            -------
+            self.doc_norms : np.array of float, shape (N,)
+                             norme du vecteur des poids de chaque document
+        '''
+        return self.get_doc_weights()[1]
+
     def getWeightsForStem(self, stem):
         '''
             retourne les poids du terme stem pour tous les
@@ -66,18 +172,21 @@ class Weighter1(Weighter):
         Pondération tf pour les documents et les termes
         Pondération 0-1 pour les termes de la requête
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier du cache des poids des documents
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
         '''
-        super(Weighter1, self).__init__(indexer)
+        super(Weighter1, self).__init__(indexer, cache_dir)
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -98,6 +207,17 @@ class Weighter1(Weighter):
         '''
         return self.indexer.getTfsForDoc(idDoc)
 
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les pondérations tf des termes de tous les documents
+
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des nombres d'occurrences
+        '''
+        return self.indexer.get_matrix().astype(np.float64)
+
     def getWeightsForStem(self, stem):
         '''
             retourne les pondérations tf du terme pour tous les documents
@@ -130,14 +250,7 @@ class Weighter1(Weighter):
                            dictionnaire associant à chaque terme de la requête
                            la pondération 1
         '''
-        query_lower = query.lower()
-        tokens = list(set(query_lower.split(" ")))
-        token_weights = dict()
-
-        for t in tokens:
-            token_weights[porter.stem(t)] = 1
-
-        return token_weights
+        return {t: 1 for t in self.indexer.getTfsForQuery(query)}
 
 class Weighter2(Weighter):
     '''
@@ -145,18 +258,21 @@ class Weighter2(Weighter):
 
         Pondération tf pour les documents, les termes, et les termes de la requête
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier du cache des poids des documents
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
         '''
-        super(Weighter2, self).__init__(indexer)
+        super(Weighter2, self).__init__(indexer, cache_dir)
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -177,6 +293,17 @@ class Weighter2(Weighter):
         '''
         return self.indexer.getTfsForDoc(idDoc)
 
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les pondérations tf des termes de tous les documents
+
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des nombres d'occurrences
+        '''
+        return self.indexer.get_matrix().astype(np.float64)
+
     def getWeightsForStem(self, stem):
         '''
             retourne les pondérations tf du terme pour tous les documents
@@ -209,16 +336,7 @@ class Weighter2(Weighter):
                            dictionnaire associant à chaque terme de la requête
                            sa pondération tf
         '''
-        tokens = query.split(" ")
-        processed_query = [porter.stem(t.lower()) for t in tokens]
-        c = collections.Counter(processed_query)
-        tokens = np.array(list(c.keys()))
-        token_counts = np.array(list(c.values()))
-        token_weights = dict()
-
-        for i in range(len(tokens)):
-            token_weights[tokens[i]] = token_counts[i]
-        return token_weights
+        return dict(self.indexer.getTfsForQuery(query))
 
 class Weighter3(Weighter):
     '''
@@ -227,18 +345,21 @@ class Weighter3(Weighter):
         Pondération tf pour les documents et les termes des documents
         Pondération idf pour les termes de la requête
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier du cache des poids des documents
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
         '''
-        super(Weighter3,self).__init__(indexer)
+        super(Weighter3, self).__init__(indexer, cache_dir)
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -259,6 +380,17 @@ class Weighter3(Weighter):
         '''
         return self.indexer.getTfsForDoc(idDoc)
 
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les pondérations tf des termes de tous les documents
+
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des nombres d'occurrences
+        '''
+        return self.indexer.get_matrix().astype(np.float64)
+
     def getWeightsForStem(self, stem):
         '''
             retourne les pondérations tf du terme pour tous les documents
@@ -291,18 +423,9 @@ class Weighter3(Weighter):
                            dictionnaire associant à chaque terme de la requête
                            sa pondération idf
         '''
-        df_dict = self.indexer.get_df()
-        N = self.indexer.N
-        tokens = query.split(" ")
-        processed_query = [porter.stem(t.lower()) for t in tokens]
-        q = list(set(processed_query))
-        token_weights = dict()
-        for t in processed_query:
-            if t in df_dict:
-                token_weights[t] = math.log((1+N)/(1+df_dict[t]))
-            else:
-                token_weights[t] = 0
-        return token_weights
+        term_ids = self.indexer.term_ids
+        return {t: self.indexer.idf(t) if t in term_ids else 0\
+                for t in self.indexer.getTfsForQuery(query)}
 
 class Weighter4(Weighter):
     '''
@@ -311,18 +434,21 @@ class Weighter4(Weighter):
         Pondération 1+log(tf) pour les documents et les termes des documents
         Pondération idf pour les termes de la requête
     '''
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier du cache des poids des documents
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
         '''
-        super(Weighter4, self).__init__(indexer)
+        super(Weighter4, self).__init__(indexer, cache_dir)
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -340,11 +466,21 @@ class Weighter4(Weighter):
                           sa pondération 1+log(tf)
 
         '''
-        doc_weights = copy.deepcopy(self.indexer.getTfsForDoc(idDoc))
+        return {t: 1 + math.log(tf) for (t, tf) in self.indexer.getTfsForDoc(idDoc).items()}
+
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les pondérations 1+log(tf) des termes de tous les
+            documents, calculées en une opération vectorisée
 
-        for t,tf in doc_weights.items():
-            doc_weights[t] = 1 + math.log(tf)
-        return doc_weights
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des pondérations 1+log(tf)
+        '''
+        weights = self.indexer.get_matrix().astype(np.float64)
+        weights.data = 1 + np.log(weights.data)
+        return weights
 
     def getWeightsForStem(self, stem):
         '''
@@ -361,11 +497,7 @@ class Weighter4(Weighter):
                            dictionnaire associant à chaque document dans lequel
                            stem apparaît sa pondération 1+log(tf)
         '''
-        stem_weights = copy.deepcopy(self.indexer.getTfsForStem(stem))
-
-        for k,tf in stem_weights.items():
-            stem_weights[k] = 1 + math.log(tf)
-        return stem_weights
+        return {k: 1 + math.log(tf) for (k, tf) in self.indexer.getTfsForStem(stem).items()}
 
     def getWeightsForQuery(self, query):
         '''
@@ -381,19 +513,9 @@ class Weighter4(Weighter):
                            dictionnaire associant à chaque terme de la requête
                            sa pondération idf
         '''
-        df_dict = self.indexer.get_df()
-        N = self.indexer.N
-        tokens = query.split(" ")
-        processed_query = [porter.stem(t.lower()) for t in tokens]
-        q = list(set(processed_query))
-        token_weights = dict()
-
-        for t in processed_query:
-            if t in df_dict:
-                token_weights[t] = math.log((1+N)/(1+df_dict[t]))
-            else:
-                token_weights[t] = 0
-        return token_weights
+        term_ids = self.indexer.term_ids
+        return {t: self.indexer.idf(t) if t in term_ids else 0\
+                for t in self.indexer.getTfsForQuery(query)}
 
 class Weighter5(Weighter):
     '''
@@ -403,18 +525,21 @@ class Weighter5(Weighter):
         Pondération (1+log(tf))*idf pour les termes de la requête
     '''
 
-    def __init__(self, indexer):
+    def __init__(self, indexer, cache_dir=None):
         '''
             paramètres
             ----------
             indexer : object IndexerSimple
+            cache_dir : string (par défault None)
+                        dossier du cache des poids des documents
 
             stocke
             ------
             self.indexer : object IndexerSimple
                            l'index passé en paramètre
+            self.cache_dir : le paramètre sus-mentionné
         '''
-        super(Weighter5, self).__init__(indexer)
+        super(Weighter5, self).__init__(indexer, cache_dir)
 
     def getWeightsForDoc(self, idDoc):
         '''
@@ -432,15 +557,25 @@ class Weighter5(Weighter):
                           sa pondération (1+log(tf))*idf
 
         '''
-        doc_weights = dict()
-        tf_dict = copy.deepcopy(self.indexer.getTfsForDoc(idDoc))
-        df_dict = self.indexer.get_df()
-        N = self.indexer.N
+        return {t: (1 + math.log(tf)) * self.indexer.idf(t)\
+                for (t, tf) in self.indexer.getTfsForDoc(idDoc).items()}
 
-        for t,tf in tf_dict.items():
-            doc_weights[t] = (1 + math.log(tf)) * (math.log((1+N)/(1+df_dict[t])))
+    def getDocWeightsMatrix(self):
+        '''
+            retourne les pondérations (1+log(tf))*idf des termes de tous
+            les documents, calculées en une opération vectorisée
 
-        return doc_weights
+            renvoie
+            -------
+            weights : scipy.sparse.csr_matrix, shape (N, V)
+                      matrice documents x termes des pondérations
+                      (1+log(tf))*idf
+        '''
+        N = self.indexer.N
+        idf = np.log((1+N)/(1+self.indexer.term_df))
+        weights = self.indexer.get_matrix().astype(np.float64)
+        weights.data = (1 + np.log(weights.data)) * idf[weights.indices]
+        return weights
 
     def getWeightsForStem(self, stem):
         '''
@@ -457,13 +592,8 @@ class Weighter5(Weighter):
                            dictionnaire associant à chaque document dans lequel
                            stem apparaît sa pondération (1+log(tf))*idf
         '''
-        stem_weights = dict()
-        tf_dict = copy.deepcopy(self.indexer.getTfsForStem(stem))
-        df_dict = self.indexer.get_df()
-        N = self.indexer.N
-        for t,tf in tf_dict.items():
-            stem_weights[t] = (1 + math.log(tf)) * (math.log((1+N)/(1+df_dict[stem])))
-        return stem_weights
+        idf = self.indexer.idf(stem)
+        return {k: (1 + math.log(tf)) * idf for (k, tf) in self.indexer.getTfsForStem(stem).items()}
 
     def getWeightsForQuery(self, query):
         '''
@@ -479,23 +609,8 @@ class Weighter5(Weighter):
                            dictionnaire associant à chaque terme de la requête
                            sa pondération (1+log(tf))*idf
         '''
-        df_dict = self.indexer.get_df()
-        N = self.indexer.N
-
-        tokens = query.split(" ")
-        processed_query = [porter.stem(t.lower()) for t in tokens]
-        c = collections.Counter(processed_query)
-        tokens = np.array(list(c.keys()))
-        token_counts = np.array(list(c.values()))
-        token_weights = dict()
-
-        for i in range(len(tokens)):
-            if tokens[i] in df_dict:
-                token_weights[tokens[i]] = (1+math.log(token_counts[i])) * \
-                        (math.log((1+N)/(1+df_dict[tokens[i]])))
-            else:
-                token_weights[tokens[i]] = 0
-
-        return token_weights
+        term_ids = self.indexer.term_ids
+        return {t: (1 + math.log(tf)) * self.indexer.idf(t) if t in term_ids else 0\
+                for (t, tf) in self.indexer.getTfsForQuery(query).items()}
 
 